@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO, Tuple
+
+from app.scenario import scenario_from_dict
+from app.simulation import Simulation
+
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a single scenario through Simulation.
+
+    A scenario looks like:
+        {"id": "s1", "field": [10, 10],
+         "cars": [{"name": "A", "x": 1, "y": 2, "direction": "N", "commands": "FFRFF"}]}
+
+    Returns:
+        {"id", "results" (the run_all history), "errors" (rejected cars), "timings" (seconds)}
+    """
+    started = time.perf_counter()
+    field, rows = scenario_from_dict(scenario)
+    sim = Simulation(field)
+    errors = sim.add_cars(rows)
+    loaded = time.perf_counter()
+    results = sim.run_all()
+    finished = time.perf_counter()
+
+    return {
+        "id": scenario.get("id"),
+        "results": results,
+        "errors": [{"row": row, "error": message} for row, message in errors],
+        "timings": {"setup": loaded - started, "run": finished - loaded},
+    }
+
+
+def _run_chunk(chunk: List[Tuple[int, str]]) -> List[str]:
+    """
+    Worker side: run a chunk of (line number, JSON line) and return JSON result lines.
+    Parsing and serialising happen in the worker so the parent only moves strings.
+    """
+    output = []
+    for index, line in chunk:
+        try:
+            result = run_scenario(json.loads(line))
+        except (KeyError, TypeError, ValueError) as e:
+            result = {"id": None, "error": f"Invalid scenario: {e}"}
+        result["index"] = index
+        output.append(json.dumps(result))
+    return output
+
+
+def _chunks(lines: Iterable[str], chunksize: int) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Group the non-blank input lines into numbered chunks.
+    """
+    numbered = ((i, line) for i, line in enumerate(lines) if line.strip())
+    while chunk := list(islice(numbered, chunksize)):
+        yield chunk
+
+
+def run_batch(
+    lines: Iterable[str],
+    out: TextIO,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    ordered: bool = True
+) -> int:
+    """
+    Fan JSONL scenarios out over a process pool and stream JSONL results to out.
+
+    At most two chunks per worker are in flight, so neither the input nor the
+    results are ever fully held in memory.
+
+    Args:
+        lines: JSONL scenarios, one per line.
+        out: Where the result lines are written.
+        workers: Number of worker processes, defaults to the number of CPUs.
+        chunksize: Scenarios sent to a worker at once.
+        ordered: Write results in input order, otherwise in completion order.
+
+    Returns:
+        Number of scenarios processed.
+    """
+    count = 0
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+
+        def drain(block_until: int) -> None:
+            nonlocal count
+            while len(pending) > block_until:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = list(finished)
+                    for future in done:
+                        pending.remove(future)
+                for future in done:
+                    for line in future.result():
+                        out.write(line + "\n")
+                        count += 1
+
+        for chunk in _chunks(lines, chunksize):
+            pending.append(executor.submit(_run_chunk, chunk))
+            drain(window)
+        drain(0)
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: python -m app.batch scenarios.jsonl -o results.jsonl"""
+    parser = argparse.ArgumentParser(description="Run JSONL scenarios over a process pool.")
+    parser.add_argument("input", help="JSONL scenario file, '-' for stdin")
+    parser.add_argument("-o", "--output", help="JSONL result file, stdout if omitted")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=64, help="Scenarios per task")
+    parser.add_argument("--unordered", action="store_true", help="Write results in completion order")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        run_batch(source, out, workers=args.workers, chunksize=args.chunksize, ordered=not args.unordered)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
-from typing import Tuple
+import re
+from typing import Tuple, Union
 
 from app.field import Field
-from app.constants import DIRECTIONS, MOVES
+from app.constants import DIRECTIONS, HEADINGS, HEADING_MOVES, HEADING_TURNS
+from app.program import WINDOW_SIZE, CommandStream, Program, compile_commands
+
+_LEFT, _RIGHT, _FORWARD = b"LRF"
+_NOT_FORWARD = re.compile(rb"[^F]")
+
+
+def _turns(program: Program, start: int, stop: int) -> int:
+    """Net quarter turns to the right over the steps [start, stop) of a Program."""
+    return (program.count(_RIGHT, start) - program.count(_RIGHT, stop)
+            - program.count(_LEFT, start) + program.count(_LEFT, stop))
 
 
 class Car:
     """
     Car Class that define the individual car
+
+    Kept compact since fleets run to millions of cars: no per-instance __dict__,
+    the heading is an int (index into DIRECTIONS) and the commands are ASCII bytes
+    (or any bytes-like object, such as a slice of a memory-mapped checkpoint).
+    Compressed commands such as "F1000" or "(FFR)*250" are kept as a Program,
+    which indexes like the expanded bytes, and commands too long to hold in memory
+    are read as the car runs from a CommandStream.
     """
 
+    __slots__ = ("name", "x", "y", "heading", "field", "_program", "command_index", "frozen")
+
     def __init__(self, name: str, x: int, y: int, direction: str, field: Field) -> None:
         """
         Initiation with mandatory
@@ -19,13 +39,50 @@ class Car:
         self.name: str = name
         self.x: int = x
         self.y: int = y
-        self.direction: str = direction
+        self.heading: int = HEADINGS[direction]
         self.field: Field = field
 
-        self.commands: str = ""
+        self._program: bytes = b""
         self.command_index: int = 0
         self.frozen: bool = False
 
+    @property
+    def direction(self) -> str:
+        """
+        Facing direction as a letter of DIRECTIONS
+        """
+        return DIRECTIONS[self.heading]
+
+    @direction.setter
+    def direction(self, direction: str) -> None:
+        self.heading = HEADINGS[direction]
+
+    @property
+    def commands(self) -> str:
+        """
+        Command string of the car, where streamed commands come from for a CommandStream
+        """
+        if isinstance(self._program, (Program, CommandStream)):
+            return self._program.source
+        return str(self._program, "ascii")
+
+    @commands.setter
+    def commands(self, cmd_string: Union[str, CommandStream]) -> None:
+        if isinstance(cmd_string, CommandStream):
+            self._program = cmd_string
+        else:
+            self._program = compile_commands(cmd_string)
+
+    def __getstate__(self):
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        if not isinstance(self._program, (Program, CommandStream)):
+            state["_program"] = bytes(self._program)
+        return None, state
+
+    def __setstate__(self, state) -> None:
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+
     def set_commands(self, cmd_string: str) -> None:
         """
         Set the command, reset command index after new command issued
@@ -37,17 +94,113 @@ class Car:
         """
         Function to determine if the car need to be stopped
         """
-        return self.command_index < len(self.commands)
+        return self.command_index < len(self._program)
+
+    def next_command(self) -> int:
+        """
+        ASCII code of the next command to execute, -1 once the commands are exhausted
+        """
+        if not self.has_remaining_commands():
+            return -1
+        return self._program[self.command_index]
 
     def execute_next(self) -> None:
         """
         function to iterate the execution of command
+
+        The hottest path of the step loop: _apply inlined, the turn a table lookup
         """
-        if not self.has_remaining_commands():
+        index, program = self.command_index, self._program
+        if index >= len(program):
             return
-        command = self.commands[self.command_index]
-        self.execute(command)
-        self.command_index += 1
+        code = program[index]
+        self.command_index = index + 1
+        if code == _FORWARD:
+            dx, dy = HEADING_MOVES[self.heading]
+            new_x, new_y = self.x + dx, self.y + dy
+            if self.field.is_passable(new_x, new_y):
+                self.x, self.y = new_x, new_y
+        else:
+            self.heading = HEADING_TURNS[self.heading][code]
+
+    def idle_steps(self) -> int:
+        """
+        Number of the next commands that leave the car on its cell: turns, unknown
+        letters, and forwards stopped by the field edge or an obstacle. All the
+        remaining commands when the car will never move again (at most WINDOW_SIZE
+        of them for views and streams, which are looked at a window at a time).
+        """
+        program, start, heading = self._program, self.command_index, self.heading
+        x, y, field = self.x, self.y, self.field
+        if not isinstance(program, (bytes, Program)):
+            # A car idle to the end of the window is checked again from there
+            program, start = bytes(program[start:start + WINDOW_SIZE]), 0
+        end = len(program)
+        if not any(field.is_passable(x + dx, y + dy) for dx, dy in HEADING_MOVES):
+            return end - start
+        if isinstance(program, Program):
+            # Compressed commands are only made of F, L and R: jump from forward to forward
+            index = start
+            while index < end:
+                forward = program.find(_FORWARD, index)
+                if forward < 0:
+                    break
+                heading = (heading + _turns(program, index, forward)) % 4
+                dx, dy = HEADING_MOVES[heading]
+                if field.is_passable(x + dx, y + dy):
+                    return forward - start
+                turns = [i for i in (program.find(_LEFT, forward), program.find(_RIGHT, forward)) if i >= 0]
+                if not turns:
+                    break
+                index = min(turns)
+            return end - start
+
+        # Idle stretches are mostly a turn or two: walk the first commands one by one
+        stop = min(start + 8, end)
+        for index in range(start, stop):
+            code = program[index]
+            if code == _FORWARD:
+                dx, dy = HEADING_MOVES[heading]
+                if field.is_passable(x + dx, y + dy):
+                    return index - start
+            else:
+                heading = HEADING_TURNS[heading][code]
+
+        # Longer ones are skipped at C speed: between two forwards there are only turns
+        index = stop
+        while index < end:
+            forward = program.find(_FORWARD, index)
+            if forward < 0:
+                break
+            heading = (heading + program.count(_RIGHT, index, forward) - program.count(_LEFT, index, forward)) % 4
+            dx, dy = HEADING_MOVES[heading]
+            if field.is_passable(x + dx, y + dy):
+                return forward - start
+            # The heading holds until the next other command, so the whole run of forwards is blocked
+            after = _NOT_FORWARD.search(program, forward)
+            if after is None:
+                break
+            index = after.start()
+        return end - start
+
+    def skip_idle(self, steps: int) -> int:
+        """
+        Execute the next `steps` commands (at most the remaining ones), known (see
+        idle_steps) not to move the car: only their turns are applied, in closed form.
+        Returns the number of commands executed.
+        """
+        program, start = self._program, self.command_index
+        stop = min(start + steps, len(program))
+        steps = stop - start
+        if isinstance(program, Program):
+            turns = _turns(program, start, stop)
+        else:
+            window = program if isinstance(program, bytes) else bytes(program[start:stop])
+            offset = start if window is program else 0
+            turns = window.count(_RIGHT, offset, offset + steps) - window.count(_LEFT, offset, offset + steps)
+        self.heading = (self.heading + turns) % 4
+        self.command_index = stop
+        return steps
 
     def execute(self, command: str) -> None:
         """
@@ -55,17 +208,20 @@ class Car:
 
         Having a significant responsibility by Car class to check if the movement is valid seems grey
         """
-        if command == 'L':
-            idx = (DIRECTIONS.index(self.direction) - 1) % 4
-            self.direction = DIRECTIONS[idx]
-        elif command == 'R':
-            idx = (DIRECTIONS.index(self.direction) + 1) % 4
-            self.direction = DIRECTIONS[idx]
-        elif command == 'F':
-            dx, dy = MOVES[self.direction]
+        if len(command) == 1 and command.isascii():
+            self._apply(ord(command))
+
+    def _apply(self, code: int) -> None:
+        """
+        Execute a command given as its ASCII code, unknown commands are ignored
+        """
+        if code != _FORWARD:
+            self.heading = HEADING_TURNS[self.heading][code]
+        else:
+            dx, dy = HEADING_MOVES[self.heading]
             new_x = self.x + dx
             new_y = self.y + dy
-            if self.field.is_within_bounds(new_x, new_y):
+            if self.field.is_passable(new_x, new_y):
                 self.x, self.y = new_x, new_y
 
     def position(self) -> Tuple[int, int]:
@@ -81,4 +237,4 @@ class Car:
 
         return position in addition to the attitude of the car
         """
-        return self.x, self.y, self.direction
+        return self.x, self.y, DIRECTIONS[self.heading]
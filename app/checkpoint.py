@@ -0,0 +1,164 @@
+import mmap
+import os
+import struct
+from array import array
+from typing import List
+
+from app.car import Car
+from app.field import Field
+from app.program import CommandStream, Program, compile_commands
+from app.simulation import Simulation
+
+MAGIC = b"ADSCKPT1"
+VERSION = 2
+# magic, version, width, height, step_count, car_count, collision_count, partner_count, obstacle_bytes
+HEADER = struct.Struct("<8sIqqqqqqq")
+# Bits of the per-car flags byte
+FROZEN, COMPRESSED = 1, 2
+
+
+def _pad(size: int) -> int:
+    """Round size up so that every section starts 8-byte aligned."""
+    return (size + 7) & ~7
+
+
+def save_checkpoint(simulation: Simulation, path: str) -> None:
+    """
+    Write the full state of a simulation, including a run in progress, to a binary file.
+
+    The layout is columnar: fixed-width int64 arrays (positions, command indices, string
+    offsets, collision records), one byte per car for heading and flags, then the
+    names and command programs as blobs. A collision entry is stored as (car, step,
+    partners) only: a collided car is frozen, so its current state is its collision state.
+    Compressed programs (see app.program) are stored as their source text and flagged.
+    The obstacle bitmap of the field, if any, comes last.
+    The file is written next to path and renamed over it, so a crash never leaves a
+    truncated checkpoint behind.
+
+    Raises:
+        ValueError if a car reads streamed commands, which are only held in part.
+    """
+    cars = list(simulation.cars.values())
+    streamed = next((car.name for car in cars if isinstance(car._program, CommandStream)), None)
+    if streamed is not None:
+        raise ValueError(f"Car '{streamed}' reads streamed commands and cannot be checkpointed.")
+    simulation._catch_up()
+    index = {car.name: i for i, car in enumerate(cars)}
+
+    names = [car.name.encode("utf-8") for car in cars]
+    programs = [
+        car.commands.encode("ascii") if isinstance(car._program, Program) else bytes(car._program)
+        for car in cars
+    ]
+    collision_car = array("q", (index[entry["name"]] for entry in simulation.collisions))
+    collision_step = array("q", (entry["collision"]["step"] for entry in simulation.collisions))
+    partner_offsets = array("q", [0])
+    partners = array("q")
+    for entry in simulation.collisions:
+        partners.extend(index[name] for name in entry["collision"]["with"])
+        partner_offsets.append(len(partners))
+
+    sections = [
+        array("q", (car.x for car in cars)),
+        array("q", (car.y for car in cars)),
+        array("q", (car.command_index for car in cars)),
+        _offsets(names),
+        _offsets(programs),
+        collision_car,
+        collision_step,
+        partner_offsets,
+        partners,
+        array("B", (car.heading for car in cars)),
+        array("B", (car.frozen | isinstance(car._program, Program) << 1 for car in cars)),
+        b"".join(names),
+        b"".join(programs),
+        bytes(simulation.field.obstacles or b""),
+    ]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, simulation.field.width, simulation.field.height, simulation.step_count,
+            len(cars), len(collision_car), len(partners), len(sections[-1])
+        ))
+        for section in sections:
+            data = section.tobytes() if isinstance(section, array) else section
+            f.write(data)
+            f.write(b"\0" * (_pad(len(data)) - len(data)))
+    os.replace(tmp_path, path)
+
+
+def _offsets(blobs: List[bytes]) -> array:
+    offsets = array("q", [0])
+    total = 0
+    for blob in blobs:
+        total += len(blob)
+        offsets.append(total)
+    return offsets
+
+
+def load_checkpoint(path: str) -> Simulation:
+    """
+    Rebuild a simulation from a checkpoint written by save_checkpoint.
+
+    The file is memory-mapped and its arrays are read in place through memoryviews.
+    Command programs and the obstacle bitmap are not copied at all: each car runs straight
+    off its slice of the mapping, so only the pages actually used are ever read from disk.
+    Calling run_all or iter_events on the result continues the run exactly where it was saved.
+
+    Raises:
+        ValueError if the file is not a checkpoint.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if len(view) < HEADER.size:
+        raise ValueError(f"{path} is not a simulation checkpoint.")
+    magic, version, width, height, step_count, car_count, collision_count, partner_count, obstacle_bytes = \
+        HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a simulation checkpoint.")
+
+    position = HEADER.size
+
+    def section(length: int, fmt: str) -> memoryview:
+        nonlocal position
+        size = length * struct.calcsize(fmt)
+        data = view[position:position + size].cast(fmt)
+        position += _pad(size)
+        return data
+
+    xs, ys, command_indices = section(car_count, "q"), section(car_count, "q"), section(car_count, "q")
+    name_offsets, program_offsets = section(car_count + 1, "q"), section(car_count + 1, "q")
+    collision_car, collision_step = section(collision_count, "q"), section(collision_count, "q")
+    partner_offsets, partners = section(collision_count + 1, "q"), section(partner_count, "q")
+    headings, flags = section(car_count, "B"), section(car_count, "B")
+    names = section(name_offsets[car_count], "B")
+    programs = section(program_offsets[car_count], "B")
+    obstacles = section(obstacle_bytes, "B")
+
+    field = Field.from_bitmap(width, height, obstacles) if obstacle_bytes else Field(width, height)
+    simulation = Simulation(field)
+    cars = []
+    for i in range(car_count):
+        car = Car(str(names[name_offsets[i]:name_offsets[i + 1]], "utf-8"), xs[i], ys[i], "N", simulation.field)
+        car.heading = headings[i]
+        program = programs[program_offsets[i]:program_offsets[i + 1]]
+        car._program = compile_commands(str(program, "ascii")) if flags[i] & COMPRESSED else program
+        car.command_index = command_indices[i]
+        car.frozen = bool(flags[i] & FROZEN)
+        simulation.cars[car.name] = car
+        cars.append(car)
+    simulation._reindex()
+
+    simulation.step_count = step_count
+    simulation.collisions = [
+        Simulation._create_history_entry(
+            cars[collision_car[k]],
+            status="collided",
+            step=collision_step[k],
+            occupants=[cars[p] for p in partners[partner_offsets[k]:partner_offsets[k + 1]]]
+        )
+        for k in range(collision_count)
+    ]
+    return simulation
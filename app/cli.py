@@ -1,7 +1,22 @@
+import json
+import sys
+from typing import Dict, Any, Iterable
+
 from app.field import Field
+from app.program import validate_commands
+from app.scenario import parse_scenario
 from app.simulation import Simulation
 
 
+def format_result(result: Dict[str, Any]) -> str:
+    """Format one run_all entry the way the CLI reports it."""
+    if result["status"] == "collided":
+        collision = result["collision"]
+        return (f"- {result['name']}, collides with {', '.join(collision['with'])} "
+                f"at ({collision['at']['x']},{collision['at']['y']}) at step {collision['step']}")
+    return f"- {result['name']}, ({result['final']['x']},{result['final']['y']}) {result['final']['direction']}"
+
+
 class SimulationCLI:
     """CLI interface for running an Auto Driving Car Simulation."""
     def __init__(self) -> None:
@@ -94,15 +109,22 @@ class SimulationCLI:
             print(f"Position ({x},{y}) is outside the field bounds.")
             return
 
+        # Check if position is blocked
+        if self.sim.field.is_blocked(x, y):
+            print(f"Position ({x},{y}) is blocked by an obstacle.")
+            return
+
         # Check if position is occupied
-        if (x, y) in [car.position()[:2] for car in self.sim.cars.values()]:
+        if self.sim.is_occupied(x, y):
             print(f"Position ({x},{y}) is already occupied by another car.")
             return
 
         # Command string check
         commands = input(f"Please enter the commands for car {name}: ").strip().upper()
-        if not all(c in "FLR" for c in commands):
-            print("Commands must only contain F, L, R.")
+        try:
+            validate_commands(commands)
+        except ValueError as e:
+            print(e)
             return
 
         # Add car
@@ -120,15 +142,11 @@ class SimulationCLI:
         self.print_car_list()
         print("\nRunning simulation...\n")
 
-        results = self.sim.run_all()
+        results = self.sim.run_all(columnar=True)
 
         print("After simulation, the result is:")
         for r in results:
-            if r["status"] == "collided":
-                print(
-                    f"- {r['name']}, collides with {', '.join(r['collision']['with'])} at ({r['collision']['at']['x']},{r['collision']['at']['y']}) at step {r['collision']['step']}")
-            else:
-                print(f"- {r['name']}, ({r['final']['x']},{r['final']['y']}) {r['final']['direction']}")
+            print(format_result(r))
 
         self.post_simulation_options()
 
@@ -146,4 +164,48 @@ class SimulationCLI:
                 print("Thank you for running the simulation. Goodbye!")
                 return
             else:
-                print("Invalid option.")
\ No newline at end of file
+                print("Invalid option.")
+
+    def run_scenario(
+        self,
+        lines: Iterable[str],
+        quiet: bool = False,
+        output_format: str = "text",
+        instrument: bool = False
+    ) -> int:
+        """
+        Non-interactive mode: parse a whole scenario in one pass, run it and print the results once.
+
+        Rejected cars are reported but do not stop the run. Quiet mode prints the result
+        lines only. With instrument, the phase timers and counters of the run are printed
+        to standard error, so they never mix with the results.
+
+        Returns:
+            Exit status, 1 if the scenario could not be read or some cars were rejected.
+        """
+        try:
+            field, rows, errors = parse_scenario(lines)
+        except ValueError as e:
+            print(f"Invalid scenario: {e}")
+            return 1
+        self.sim = Simulation(field)
+        errors = [f"Line {number}: {message}" for number, message in errors]
+        errors += [f"Car {rows[row][0]}: {message}" for row, message in self.sim.add_cars(rows)]
+
+        if instrument:
+            self.sim.instrument()
+        results = self.sim.run_all(columnar=True)
+        if instrument:
+            print(self.sim.instrumentation.summary(), file=sys.stderr)
+
+        if output_format == "json":
+            print(json.dumps({"results": results.to_list(), "errors": errors}))
+        else:
+            if not quiet:
+                for error in errors:
+                    print(error)
+                print(f"Running simulation of {len(self.sim.cars)} cars...")
+                print("After simulation, the result is:")
+            for r in results:
+                print(format_result(r))
+        return 1 if errors else 0
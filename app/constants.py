@@ -1,2 +1,13 @@
 DIRECTIONS = ['N', 'E', 'S', 'W']
-MOVES = {'N': (0, 1), 'E': (1, 0), 'S': (0, -1), 'W': (-1, 0)}
\ No newline at end of file
+MOVES = {'N': (0, 1), 'E': (1, 0), 'S': (0, -1), 'W': (-1, 0)}
+# Occupancy backend selection (see app.occupancy.choose_occupancy)
+SMALL_FIELD_AREA = 1 << 16
+DENSE_MAX_AREA = 1 << 24
+DENSE_MIN_DENSITY = 1 / 64
+
+# Integer headings: index into DIRECTIONS, turning right is +1 and left is -1 (mod 4)
+HEADINGS = {d: i for i, d in enumerate(DIRECTIONS)}
+HEADING_MOVES = [MOVES[d] for d in DIRECTIONS]
+# Heading after a command, indexed by heading then by the ASCII code of the command:
+# L and R turn, F and unknown letters keep the heading
+HEADING_TURNS = [bytes((h + (code == ord('R')) - (code == ord('L'))) % 4 for code in range(256)) for h in range(4)]
@@ -1,14 +1,158 @@
+from typing import Iterable, Optional, Tuple, Union
+
+# Character of a blocked cell in an obstacle map file, any other character is free
+WALL = ord("#")
+
+Bitmap = Union[bytes, bytearray, memoryview]
+
 
 class Field:
     """
-    Just a simple class to define the field. Could expand easily, like adding of wall, if need.
+    Just a simple class to define the field, with optional static obstacles.
+
+    Obstacles are kept in a packed bitmap, one bit per cell: bit y * width + x (least
+    significant bit first) is set when the cell is blocked. A field without obstacles
+    has no bitmap at all. Blocked cells reject F moves like the field edge does.
     """
-    def __init__(self, width: int, height: int) -> None:
+    def __init__(self, width: int, height: int, obstacles: Optional[Iterable[Tuple[int, int]]] = None) -> None:
         self.width = width
         self.height = height
+        self.obstacles: Optional[Bitmap] = None
+        if obstacles is not None:
+            for x, y in obstacles:
+                self.add_obstacle(x, y)
+
+    @classmethod
+    def from_bitmap(cls, width: int, height: int, bitmap: Bitmap) -> "Field":
+        """
+        Field using bitmap as its obstacle bitmap, without copying it.
+
+        Raises:
+            ValueError if the bitmap is too short for the field.
+        """
+        if len(bitmap) < (width * height + 7) // 8:
+            raise ValueError(f"Obstacle bitmap is too short for a {width}x{height} field.")
+        field = cls(width, height)
+        field.obstacles = bitmap
+        return field
+
+    @classmethod
+    def from_grid(cls, grid) -> "Field":
+        """
+        Field sized after a 2-D grid of booleans, grid[y][x] being True for a blocked cell.
+        NumPy boolean arrays are packed without a Python loop.
+        """
+        if hasattr(grid, "shape"):
+            import numpy as np
+            height, width = grid.shape
+            bitmap = np.packbits(np.asarray(grid, dtype=bool).ravel(), bitorder="little").tobytes()
+            return cls.from_bitmap(width, height, bitmap)
+        rows = [bytes(WALL if cell else ord(".") for cell in row) for row in grid]
+        return cls._from_rows(rows)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Field":
+        """
+        Load an obstacle map: one text line per row of the field, '#' for a blocked cell and
+        any other character (usually '.') for a free one. As on a picture, the first line is
+        the top row (y = height - 1).
+
+        Raises:
+            ValueError if the rows are not all of the same length.
+        """
+        with open(path, "rb") as f:
+            rows = f.read().splitlines()
+        while rows and not rows[-1].strip():
+            rows.pop()
+        return cls._from_rows(rows[::-1])
+
+    @classmethod
+    def _from_rows(cls, rows) -> "Field":
+        """
+        Field from rows of map bytes, rows[y] being the row y.
+
+        The rows are joined into one string of binary digits, cell key 0 last, which
+        int() turns into the bitmap in linear time.
+        """
+        width = len(rows[0]) if rows else 0
+        if any(len(row) != width for row in rows):
+            raise ValueError("Obstacle map rows must all have the same length.")
+        table = bytes(ord("1") if c == WALL else ord("0") for c in range(256))
+        digits = b"".join(rows).translate(table)[::-1]
+        bitmap = int(digits or b"0", 2).to_bytes((len(digits) + 7) // 8, "little")
+        return cls.from_bitmap(width, len(rows), bitmap)
+
+    def add_obstacle(self, x: int, y: int) -> None:
+        """
+        Block the cell (x, y)
+
+        Raises:
+            ValueError if the cell is outside the field.
+        """
+        if not self.is_within_bounds(x, y):
+            raise ValueError(f"Obstacle ({x}, {y}) is outside the field bounds.")
+        if not isinstance(self.obstacles, bytearray):
+            size = (self.width * self.height + 7) // 8
+            self.obstacles = bytearray(self.obstacles or size)
+        key = y * self.width + x
+        self.obstacles[key >> 3] |= 1 << (key & 7)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if isinstance(self.obstacles, memoryview):
+            state["obstacles"] = bytes(self.obstacles)
+        return state
+
+    @property
+    def has_obstacles(self) -> bool:
+        return self.obstacles is not None
+
+    def obstacle_count(self) -> int:
+        """
+        Number of blocked cells
+        """
+        if self.obstacles is None:
+            return 0
+        return int.from_bytes(self.obstacles, "little").bit_count()
 
     def is_within_bounds(self, x: int, y: int) -> bool:
         """
         Mostly use by car to check if the move is valid
         """
         return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        """
+        Whether (x, y), assumed within bounds, holds an obstacle
+        """
+        if self.obstacles is None:
+            return False
+        key = y * self.width + x
+        return bool(self.obstacles[key >> 3] >> (key & 7) & 1)
+
+    def is_passable(self, x: int, y: int) -> bool:
+        """
+        Whether a car may stand on (x, y): within bounds and free of obstacles
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if self.obstacles is None:
+            return True
+        key = y * self.width + x
+        return not self.obstacles[key >> 3] >> (key & 7) & 1
+
+    def passable_mask(self, xs, ys):
+        """
+        Batch version of is_passable for NumPy integer arrays of coordinates.
+
+        Returns:
+            Boolean NumPy array, True where the cell is passable.
+        """
+        import numpy as np
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if self.obstacles is None:
+            return inside
+        keys = np.where(inside, ys * self.width + xs, 0)
+        bitmap = np.frombuffer(self.obstacles, dtype=np.uint8)
+        blocked = (bitmap[keys >> 3] >> (keys & 7).astype(np.uint8)) & 1
+        return inside & (blocked == 0)
@@ -0,0 +1,82 @@
+import time
+from typing import List, Dict, Any, Callable
+
+# Phases of Simulation.iter_events timed by Instrumentation
+PHASES = ("occupancy", "move", "collisions", "history")
+# Events counted by Instrumentation
+COUNTERS = ("steps", "moves", "blocked", "turns", "skipped", "cells_checked", "collisions")
+
+StepCallback = Callable[[int, "Instrumentation"], None]
+
+
+class Instrumentation:
+    """
+    Opt-in timers, counters and per-step callbacks for Simulation.iter_events (and run_all).
+
+    Phases:
+    - occupancy: building the position map of the cars
+    - move: executing the next command of every mover and updating the position map
+    - collisions: checking the entered cells for shared occupancy
+    - history: building the history entries
+    Counters:
+    - steps, moves (cars that changed cell), blocked (forward commands stopped by the
+      field edge), turns, skipped (commands of parked cars fast-forwarded over, see
+      Simulation.fast_forward), cells_checked (entered cells checked), collisions (cars frozen)
+
+    A simulation without instrumentation runs its plain loop, so leaving it off costs
+    one check per step.
+    """
+
+    def __init__(self) -> None:
+        self.timers: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.callbacks: List[StepCallback] = []
+
+    def on_step(self, callback: StepCallback) -> StepCallback:
+        """
+        Register callback(step, instrumentation), called at the end of every step.
+        Returns the callback, so this can be used as a decorator.
+        """
+        self.callbacks.append(callback)
+        return callback
+
+    def reset(self) -> None:
+        """
+        Zero the timers and counters, keeping the callbacks.
+        """
+        self.timers = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def add_time(self, phase: str, started: float) -> float:
+        """
+        Charge the time elapsed since started to phase.
+
+        Returns:
+            The current time, to start timing the next phase.
+        """
+        now = time.perf_counter()
+        self.timers[phase] += now - started
+        return now
+
+    def step_done(self, step: int) -> None:
+        """
+        Count a finished step and notify the callbacks.
+        """
+        self.counters["steps"] += 1
+        for callback in self.callbacks:
+            callback(step, self)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Timers (seconds) and counters as a JSON-ready dictionary.
+        """
+        return {"timers": dict(self.timers), "counters": dict(self.counters)}
+
+    def summary(self) -> str:
+        """
+        Timers and counters as readable lines.
+        """
+        total = sum(self.timers.values()) or 1.0
+        lines = [f"{phase:<14}{seconds:>10.4f} s {seconds / total:>6.1%}" for phase, seconds in self.timers.items()]
+        lines += [f"{counter:<14}{count:>10}" for counter, count in self.counters.items()]
+        return "\n".join(lines)
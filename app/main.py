@@ -1,4 +1,57 @@
+import argparse
+import cProfile
+import sys
+from typing import List, Optional
+
 from app.cli import SimulationCLI
 
+
+def start_simulation(argv: Optional[List[str]] = None) -> int:
+    """
+    Console entry point (auto-drive).
+
+    Without arguments the interactive CLI starts. With --scenario FILE or --stdin the
+    whole scenario is read at once: the field size on the first line, then one car
+    per line as "name x y D commands".
+
+    With --profile FILE the whole session runs under cProfile and the statistics are
+    written to FILE, to be read with pstats (python -m pstats FILE). A scenario run
+    also prints its phase timers and counters to standard error.
+    """
+    parser = argparse.ArgumentParser(prog="auto-drive", description="Auto Driving Car Simulation")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--scenario", metavar="FILE", help="Run the scenario file non-interactively")
+    source.add_argument("--stdin", action="store_true", help="Read the scenario from standard input")
+    parser.add_argument("--quiet", action="store_true", help="Only print the result lines")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format of the results")
+    parser.add_argument("--profile", metavar="FILE", help="Profile the run and write the pstats output to FILE")
+    args = parser.parse_args(argv)
+
+    if not args.profile:
+        return _run(args)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(_run, args)
+    finally:
+        profiler.dump_stats(args.profile)
+
+
+def _run(args: argparse.Namespace) -> int:
+    cli = SimulationCLI()
+    options = {"quiet": args.quiet, "output_format": args.format, "instrument": bool(args.profile)}
+    if args.stdin:
+        return cli.run_scenario(sys.stdin, **options)
+    if args.scenario:
+        try:
+            with open(args.scenario, encoding="utf-8") as scenario:
+                return cli.run_scenario(scenario, **options)
+        except OSError as e:
+            print(f"Cannot read scenario: {e}")
+            return 1
+
+    cli.start()
+    return 0
+
+
 if __name__ == "__main__":
-    SimulationCLI().start()
\ No newline at end of file
+    sys.exit(start_simulation())
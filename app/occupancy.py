@@ -0,0 +1,143 @@
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, List
+
+from app.constants import DENSE_MAX_AREA, DENSE_MIN_DENSITY, SMALL_FIELD_AREA
+from app.field import Field
+
+EMPTY = -1
+STACKED = -2
+
+
+class Occupancy(ABC):
+    """
+    Which cars stand on which cell, keyed by the integer y * width + x.
+
+    A cell holds a single car id, or the STACKED marker when several cars share it
+    (only ever after a collision), in which case the ids live in a side dict.
+    Subclasses only decide where the per-cell slots are stored.
+    """
+
+    def __init__(self, width: int) -> None:
+        self.width: int = width
+        self._stacked: Dict[int, List[int]] = {}
+
+    def key(self, x: int, y: int) -> int:
+        """
+        Integer key of the cell (x, y)
+        """
+        return y * self.width + x
+
+    def add(self, key: int, car_id: int) -> None:
+        """
+        Put car_id on the cell
+        """
+        current = self._get(key)
+        if current == EMPTY:
+            self._set(key, car_id)
+        elif current == STACKED:
+            self._stacked[key].append(car_id)
+        else:
+            self._stacked[key] = [current, car_id]
+            self._set(key, STACKED)
+
+    def remove(self, key: int, car_id: int) -> None:
+        """
+        Take car_id off the cell
+        """
+        current = self._get(key)
+        if current != STACKED:
+            self._clear(key)
+            return
+        stacked = self._stacked[key]
+        stacked.remove(car_id)
+        if len(stacked) == 1:
+            self._set(key, stacked[0])
+            del self._stacked[key]
+
+    def occupants(self, key: int) -> List[int]:
+        """
+        Ids of the cars standing on the cell, in no particular order
+        """
+        current = self._get(key)
+        if current == EMPTY:
+            return []
+        if current == STACKED:
+            return list(self._stacked[key])
+        return [current]
+
+    def is_shared(self, key: int) -> bool:
+        """
+        Whether more than one car stands on the cell
+        """
+        return self._get(key) == STACKED
+
+    @abstractmethod
+    def _get(self, key: int) -> int:
+        """
+        Slot of the cell, EMPTY if no car stands on it
+        """
+
+    @abstractmethod
+    def _set(self, key: int, value: int) -> None:
+        """
+        Store a car id or STACKED in the slot of the cell
+        """
+
+    @abstractmethod
+    def _clear(self, key: int) -> None:
+        """
+        Empty the slot of an occupied cell
+        """
+
+
+class DenseOccupancy(Occupancy):
+    """
+    Preallocated flat integer array with one slot per cell, for small or crowded fields
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width)
+        # Car ids are indices into the run's car list, 4 bytes per cell hold them
+        self._cells = array('i', [EMPTY]) * (width * height)
+
+    def _get(self, key: int) -> int:
+        return self._cells[key]
+
+    def _set(self, key: int, value: int) -> None:
+        self._cells[key] = value
+
+    def _clear(self, key: int) -> None:
+        self._cells[key] = EMPTY
+
+
+class SparseOccupancy(Occupancy):
+    """
+    Integer-keyed hash map holding only the occupied cells, for huge sparse fields
+    """
+
+    def __init__(self, width: int) -> None:
+        super().__init__(width)
+        self._cells: Dict[int, int] = {}
+
+    def _get(self, key: int) -> int:
+        return self._cells.get(key, EMPTY)
+
+    def _set(self, key: int, value: int) -> None:
+        self._cells[key] = value
+
+    def _clear(self, key: int) -> None:
+        del self._cells[key]
+
+
+def choose_occupancy(field: Field, car_count: int) -> Occupancy:
+    """
+    Pick the occupancy backend from the field area and the car density.
+
+    Small fields always get the dense array, larger ones only when the cars cover
+    enough of the field to pay for the preallocation.
+    """
+    area = field.width * field.height
+    if area <= SMALL_FIELD_AREA or (area <= DENSE_MAX_AREA and car_count >= area * DENSE_MIN_DENSITY):
+        return DenseOccupancy(field.width, field.height)
+    return SparseOccupancy(field.width)
@@ -0,0 +1,280 @@
+import multiprocessing
+import os
+from bisect import bisect_right
+from typing import List, Dict, Tuple, Any, Optional
+
+from app.car import Car
+from app.field import Field
+from app.occupancy import Occupancy, choose_occupancy
+from app.simulation import Simulation
+
+# Final state of a car sent back by a tile: (id, x, y, heading, command_index, frozen)
+CarState = Tuple[int, int, int, int, int, bool]
+
+
+class Tile:
+    """
+    One rectangular part of the field, simulated by a worker process.
+
+    Holds the cars standing on its cells and their occupancy. Every step is split in two
+    phases so that the cars crossing a tile edge can be handed over in between:
+    - move: step the local movers, hand back the cars that left the tile
+    - settle: take in the cars that arrived, then detect collisions on the entered cells
+    Once cars have been handed over, every cell belongs to exactly one tile, so collisions
+    on the tile edges are found by the tile owning the cell, as in run_all.
+    Cars are handed over without their field (which may hold a large obstacle bitmap):
+    the receiving tile attaches its own copy.
+    """
+
+    def __init__(self, x0: int, y0: int, x1: int, y1: int, cars: List[Tuple[int, Car]], field: Field) -> None:
+        """
+        Args:
+            x0, y0, x1, y1: Tile covers x0 <= x < x1 and y0 <= y < y1.
+            cars: (global id, car) pairs standing on the tile.
+            field: The whole field the cars move on.
+        """
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.field: Field = field
+        self.cars: Dict[int, Car] = {}
+        self.occupancy: Occupancy = choose_occupancy(Field(x1 - x0, y1 - y0), len(cars))
+        self.movers: List[int] = []
+        self._entered: Dict[int, None] = {}
+        for car_id, car in cars:
+            self._place(car_id, car)
+        self._refresh_movers(sorted(self.cars))
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x0 <= x < self.x1 and self.y0 <= y < self.y1
+
+    def move(self) -> List[Tuple[int, Car]]:
+        """
+        Execute the next command of every local mover.
+
+        Returns:
+            (id, car) pairs for the cars that moved out of this tile.
+        """
+        leaving = []
+        self._entered = {}
+        for car_id in self.movers:
+            car = self.cars[car_id]
+            old_key = self._key(car.x, car.y)
+            old_pos = car.position()
+            car.execute_next()
+            if car.position() == old_pos:
+                continue
+            self.occupancy.remove(old_key, car_id)
+            if self.contains(car.x, car.y):
+                self._add(car_id, car)
+            else:
+                del self.cars[car_id]
+                car.field = None
+                leaving.append((car_id, car))
+        return leaving
+
+    def settle(self, arrivals: List[Tuple[int, Car]], step: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+        """
+        Take in the cars handed over by the neighbouring tiles and detect collisions.
+
+        Returns:
+            (id, history entry) for every car that collided, and the number of cars left to move.
+        """
+        for car_id, car in arrivals:
+            car.field = self.field
+            self._place(car_id, car)
+            self._entered[self._key(car.x, car.y)] = None
+
+        collided = []
+        for key in self._entered:
+            if not self.occupancy.is_shared(key):
+                continue
+            car_ids = sorted(self.occupancy.occupants(key))
+            occupants = [self.cars[i] for i in car_ids]
+            for car_id, car in zip(car_ids, occupants):
+                if not car.frozen:
+                    collided.append((car_id, car, occupants))
+
+        entries = []
+        for car_id, car, occupants in collided:
+            car.frozen = True
+            entries.append((car_id, Simulation._create_history_entry(
+                car,
+                status="collided",
+                step=step,
+                occupants=occupants
+            )))
+
+        moved_in = [car_id for car_id, _ in arrivals]
+        self._refresh_movers(sorted(self.movers + moved_in))
+        return entries, len(self.movers)
+
+    def finish(self) -> List[CarState]:
+        """
+        Final state of every car on this tile.
+        """
+        return [
+            (car_id, car.x, car.y, car.heading, car.command_index, car.frozen)
+            for car_id, car in self.cars.items()
+        ]
+
+    def _key(self, x: int, y: int) -> int:
+        return self.occupancy.key(x - self.x0, y - self.y0)
+
+    def _add(self, car_id: int, car: Car) -> None:
+        key = self._key(car.x, car.y)
+        self.occupancy.add(key, car_id)
+        self._entered[key] = None
+
+    def _place(self, car_id: int, car: Car) -> None:
+        self.cars[car_id] = car
+        self.occupancy.add(self._key(car.x, car.y), car_id)
+
+    def _refresh_movers(self, car_ids: List[int]) -> None:
+        self.movers = [
+            i for i in car_ids
+            if i in self.cars and not self.cars[i].frozen and self.cars[i].has_remaining_commands()
+        ]
+
+
+def _tile_worker(conn, tile: Tile) -> None:
+    """
+    Serve the move / settle / finish requests of the coordinator for one tile.
+    """
+    conn.send(len(tile.movers))
+    while True:
+        request, payload = conn.recv()
+        if request == "move":
+            conn.send(tile.move())
+        elif request == "settle":
+            arrivals, step = payload
+            conn.send(tile.settle(arrivals, step))
+        else:
+            conn.send(tile.finish())
+            conn.close()
+            return
+
+
+class TiledSimulation:
+    """
+    Runs a Simulation on a grid of tiles, one worker process per tile.
+
+    Every worker goes through the same step sequence. Between the move and the collision
+    phase of a step, the coordinator routes the cars that crossed a tile edge to the
+    tile now owning their cell (a car moves at most one cell, so always a neighbour).
+    Collision entries of a step are merged in insertion order of the cars, so the
+    result is identical to run_all.
+    """
+
+    def __init__(self, simulation: Simulation, columns: Optional[int] = None, rows: int = 1) -> None:
+        """
+        Args:
+            simulation (Simulation): The simulation whose cars are to be run.
+            columns (int): Number of tile columns, defaults to the number of CPUs.
+            rows (int): Number of tile rows.
+        """
+        self.simulation: Simulation = simulation
+        field = simulation.field
+        columns = columns or os.cpu_count() or 1
+        self.x_edges: List[int] = self._edges(field.width, columns)
+        self.y_edges: List[int] = self._edges(field.height, rows)
+
+    @staticmethod
+    def _edges(length: int, parts: int) -> List[int]:
+        """
+        Lower edges of `parts` nearly equal, non-empty slices of [0, length)
+        """
+        parts = max(1, min(parts, length))
+        return [length * i // parts for i in range(parts)]
+
+    def tile_of(self, x: int, y: int) -> int:
+        """
+        Index of the tile owning cell (x, y)
+        """
+        column = bisect_right(self.x_edges, x) - 1
+        row = bisect_right(self.y_edges, y) - 1
+        return row * len(self.x_edges) + column
+
+    def tiles(self) -> List[Tile]:
+        """
+        Split the cars of the simulation over the tiles.
+        """
+        field = self.simulation.field
+        x_bounds = self.x_edges + [field.width]
+        y_bounds = self.y_edges + [field.height]
+        members: List[List[Tuple[int, Car]]] = [[] for _ in range(len(self.x_edges) * len(self.y_edges))]
+        for car_id, car in enumerate(self.simulation.cars.values()):
+            members[self.tile_of(car.x, car.y)].append((car_id, car))
+
+        return [
+            Tile(x_bounds[c], y_bounds[r], x_bounds[c + 1], y_bounds[r + 1], members[r * len(self.x_edges) + c], field)
+            for r in range(len(self.y_edges))
+            for c in range(len(self.x_edges))
+        ]
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Run all tiles in parallel until no car can move.
+
+        Car objects are updated with their final state, as run_all does.
+
+        Returns:
+            List of dictionaries in the same format as Simulation.run_all.
+        """
+        connections = []
+        processes = []
+        for tile in self.tiles():
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_tile_worker, args=(child, tile), daemon=True)
+            process.start()
+            connections.append(parent)
+            processes.append(process)
+
+        try:
+            history = self._coordinate(connections)
+            states = [state for conn in connections for state in conn.recv()]
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        cars = list(self.simulation.cars.values())
+        for car_id, x, y, heading, command_index, frozen in states:
+            car = cars[car_id]
+            car.x, car.y, car.heading = x, y, heading
+            car.command_index, car.frozen = command_index, frozen
+
+        self.simulation._log_remaining_cars(cars, history)
+        self.simulation._reindex()
+        return history
+
+    def _coordinate(self, connections) -> List[Dict[str, Any]]:
+        """
+        Drive the workers step by step and merge their collision entries.
+        """
+        history: List[Dict[str, Any]] = []
+        movers = sum(conn.recv() for conn in connections)
+        step = 0
+
+        while movers:
+            step += 1
+            for conn in connections:
+                conn.send(("move", None))
+            arrivals: List[List[Tuple[int, Car]]] = [[] for _ in connections]
+            for conn in connections:
+                for car_id, car in conn.recv():
+                    arrivals[self.tile_of(car.x, car.y)].append((car_id, car))
+
+            for conn, incoming in zip(connections, arrivals):
+                conn.send(("settle", (incoming, step)))
+            entries = []
+            movers = 0
+            for conn in connections:
+                tile_entries, tile_movers = conn.recv()
+                entries.extend(tile_entries)
+                movers += tile_movers
+            entries.sort(key=lambda item: item[0])
+            history.extend(entry for _, entry in entries)
+
+        for conn in connections:
+            conn.send(("finish", None))
+        return history
@@ -0,0 +1,503 @@
+from bisect import bisect_right
+from functools import lru_cache
+import sys
+from typing import List, Tuple, Iterable, Iterator, Optional, Union
+
+COMMAND_CODES = b"FLR"
+_TURN_CODES = b"LR"
+_SYNTAX = set("FLR0123456789()*")
+
+# A node is either a run (code, count) of one command, or a loop (body, times)
+# whose body is itself a list of nodes. Lengths are counted in steps.
+Node = Union[Tuple[int, int], "Loop"]
+
+
+class Loop:
+    """
+    A group of nodes repeated `times` times
+    """
+
+    __slots__ = ("body", "times", "offsets", "body_length")
+
+    def __init__(self, body: List[Node], times: int) -> None:
+        self.body: List[Node] = body
+        self.times: int = times
+        self.offsets: List[int] = _offsets(body)
+        self.body_length: int = self.offsets[-1]
+
+    def __len__(self) -> int:
+        return self.body_length * self.times
+
+
+def _node_length(node: Node) -> int:
+    # Not len(node): parse_program checks the length of a program before len is used on it
+    return node.body_length * node.times if isinstance(node, Loop) else node[1]
+
+
+def _offsets(nodes: List[Node]) -> List[int]:
+    """Step at which each node starts, plus the total length."""
+    offsets = [0]
+    for node in nodes:
+        offsets.append(offsets[-1] + _node_length(node))
+    return offsets
+
+
+class Program:
+    """
+    A compressed command program such as "F1000" or "(FFR)*250".
+
+    Counts and loops are kept as they are written, so memory follows the length of the
+    text, not the number of steps. It behaves like the bytes of the expanded program
+    (len and indexing give ASCII codes), and runs() walks it as (code, count) runs so an
+    engine can advance a whole run at once.
+    """
+
+    __slots__ = ("source", "nodes", "offsets")
+
+    def __init__(self, source: str, nodes: List[Node]) -> None:
+        self.source: str = source
+        self.nodes: List[Node] = nodes
+        self.offsets: List[int] = _offsets(nodes)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError("program index out of range")
+        nodes, offsets = self.nodes, self.offsets
+        while True:
+            k = bisect_right(offsets, index) - 1
+            node = nodes[k]
+            if not isinstance(node, Loop):
+                return node[0]
+            index = (index - offsets[k]) % node.body_length
+            nodes, offsets = node.body, node.offsets
+
+    def runs(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (code, count) runs covering the steps [start, stop) of the program.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start < stop:
+            yield from _runs(self.nodes, self.offsets, start, stop)
+
+    def count(self, code: int, start: int = 0) -> int:
+        """
+        Number of steps of the program from start on that execute the command code.
+        Loops are counted by multiplication, never expanded.
+        """
+        return _total(self.nodes, code) - _prefix(self.nodes, self.offsets, code, min(start, len(self)))
+
+    def find(self, code: int, start: int = 0) -> int:
+        """
+        First step from start on that executes the command code, -1 if there is none.
+        Loops without the code are skipped whole, never expanded.
+        """
+        return _find(self.nodes, self.offsets, code, start)
+
+    def expand(self) -> bytes:
+        """
+        The program as plain command bytes.
+        """
+        return b"".join(bytes([code]) * count for code, count in self.runs())
+
+    def __reduce__(self):
+        return parse_program, (self.source,)
+
+
+def _runs(nodes: List[Node], offsets: List[int], start: int, stop: int) -> Iterator[Tuple[int, int]]:
+    k = bisect_right(offsets, start) - 1
+    while k < len(nodes) and offsets[k] < stop:
+        node, base = nodes[k], offsets[k]
+        lo, hi = max(start, base) - base, min(stop, offsets[k + 1]) - base
+        if not isinstance(node, Loop):
+            yield node[0], hi - lo
+        else:
+            length = node.body_length
+            iteration, offset = divmod(lo, length)
+            while iteration * length < hi:
+                end = min(hi - iteration * length, length)
+                yield from _runs(node.body, node.offsets, offset, end)
+                iteration, offset = iteration + 1, 0
+        k += 1
+
+
+def _total(nodes: List[Node], code: int) -> int:
+    return sum(
+        node.times * _total(node.body, code) if isinstance(node, Loop) else node[1] * (node[0] == code)
+        for node in nodes
+    )
+
+
+def _prefix(nodes: List[Node], offsets: List[int], code: int, stop: int) -> int:
+    """Occurrences of code in the steps [0, stop)."""
+    k = bisect_right(offsets, stop) - 1
+    count = _total(nodes[:k], code)
+    if k < len(nodes):
+        node, rest = nodes[k], stop - offsets[k]
+        if isinstance(node, Loop):
+            full, rest = divmod(rest, node.body_length)
+            count += full * _total(node.body, code) + _prefix(node.body, node.offsets, code, rest)
+        elif node[0] == code:
+            count += rest
+    return count
+
+
+def _find(nodes: List[Node], offsets: List[int], code: int, start: int) -> int:
+    """First step of code in the steps [start, end), -1 if there is none."""
+    k = max(bisect_right(offsets, start) - 1, 0)
+    while k < len(nodes):
+        node, base = nodes[k], offsets[k]
+        lo = max(start - base, 0)
+        if not isinstance(node, Loop):
+            if node[0] == code:
+                return base + lo
+        elif _total(node.body, code):
+            iteration, offset = divmod(lo, node.body_length)
+            found = _find(node.body, node.offsets, code, offset)
+            if found < 0 and iteration + 1 < node.times:
+                iteration, found = iteration + 1, _find(node.body, node.offsets, code, 0)
+            if found >= 0:
+                return base + iteration * node.body_length + found
+        k += 1
+    return -1
+
+
+STREAM_CHUNK_SIZE = 1 << 16
+_BLANKS = b" \t\r\n"
+# Commands looked at in one go by the fast-forward searches of uncompressed programs
+WINDOW_SIZE = 1 << 12
+# Longest command string compile_commands interns, bounding its cache to about 1 MB
+INTERN_MAX_LENGTH = 256
+_STREAMED = "Streamed commands are read as they run: only the step loop (run_all, iter_events, step) can run them."
+
+
+class CommandStream:
+    """
+    Commands read from a source as a car gets to them, for programs too long to load
+    whole, such as recorded drives of hundreds of millions of commands.
+
+    It indexes like the bytes of the program for a reader moving forward, as a car's
+    command_index does; slices may look further ahead. Chunks of about chunk_size
+    commands are read as needed, and the commands before the last one indexed are
+    dropped, so memory stays bounded whatever the length. len() counts the commands
+    read so far: the read-ahead keeps it past the next command until the source runs
+    out, so it tells a car exactly whether it has commands left. Each chunk is checked as it is read: blanks and line
+    breaks are skipped, and anything else but F, L and R ends the stream there. The
+    ValueError is kept and raised each time the invalid command is read, so a reader
+    can check the next command before acting on it (as Simulation steps do).
+
+    A stream is consumed by running it, so it belongs to a single car and a single run.
+    """
+
+    __slots__ = ("source", "chunk_size", "exhausted", "_pieces", "_buffer", "_base", "_cursor", "_error")
+
+    def __init__(self, pieces: Iterable[Union[str, bytes]], source: str = "<stream>",
+                 chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        self.source: str = source
+        self.chunk_size: int = chunk_size
+        self.exhausted: bool = False
+        self._pieces: Iterator[Union[str, bytes]] = iter(pieces)
+        self._buffer: bytes = b""
+        self._base: int = 0
+        self._cursor: int = 0
+        # Message of the invalid command the stream stopped at, which len() counts
+        self._error: Optional[str] = None
+        self._read(0, 0)
+
+    @classmethod
+    def from_iterable(cls, pieces: Iterable[Union[str, bytes]], chunk_size: int = STREAM_CHUNK_SIZE) -> "CommandStream":
+        """
+        Commands from an iterable of str or bytes pieces of any size, single letters included.
+        """
+        return cls(pieces, "<stream>", chunk_size)
+
+    @classmethod
+    def from_file(cls, path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> "CommandStream":
+        """
+        Commands from a text file, read chunk by chunk. The file is closed once read to the end.
+        """
+        def pieces() -> Iterator[bytes]:
+            with open(path, "rb") as f:
+                yield from iter(lambda: f.read(chunk_size), b"")
+
+        return cls(pieces(), path, chunk_size)
+
+    @classmethod
+    def from_buffer(cls, buffer, chunk_size: int = STREAM_CHUNK_SIZE) -> "CommandStream":
+        """
+        Commands from a bytes-like object, such as an mmap or a memoryview of a region
+        of one. Only the chunks being run are copied out of it.
+        """
+        view = memoryview(buffer).cast("B")
+        pieces = (bytes(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size))
+        return cls(pieces, f"<buffer of {len(view)} bytes>", chunk_size)
+
+    def __len__(self) -> int:
+        return self._base + len(self._buffer) + (self._error is not None)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            if index.step not in (None, 1) or index.stop is None:
+                raise ValueError("Streamed commands can only be sliced forward over a bounded range.")
+            start, stop = index.start or 0, index.stop
+            self._read(start, stop)
+            # Slices only look ahead: they stop short of an invalid command
+            return self._buffer[start - self._base:stop - self._base]
+        self._cursor = index
+        offset = index - self._base
+        if not 0 <= offset < len(self._buffer) - 1:
+            self._read(index, index + 1)
+            offset = index - self._base
+            if offset >= len(self._buffer):
+                if self._error is not None:
+                    raise ValueError(self._error)
+                raise IndexError("program index out of range")
+        return self._buffer[offset]
+
+    def _read(self, start: int, stop: int) -> None:
+        """
+        Make sure the commands from start to past stop are buffered (up to the end of the
+        source), dropping those before both start and the last command indexed.
+        """
+        if start < self._base:
+            raise IndexError(f"Streamed commands before {self._base} were already dropped.")
+        while len(self) <= stop and not self.exhausted:
+            keep = min(start, self._cursor, self._base + len(self._buffer))
+            if keep > self._base:
+                self._buffer = self._buffer[keep - self._base:]
+                self._base = keep
+            self._buffer += self._chunk()
+
+    def _chunk(self) -> bytes:
+        """
+        Read the next chunk of about chunk_size checked commands, empty at the end of the source.
+        An invalid command ends the chunk and the stream.
+        """
+        pieces, size = [], 0
+        while size < self.chunk_size:
+            piece = next(self._pieces, None)
+            if piece is None:
+                self.exhausted = True
+                break
+            if isinstance(piece, str):
+                piece = piece.encode("ascii", "replace")
+            piece = bytes(piece).translate(None, _BLANKS)
+            invalid = piece.translate(None, COMMAND_CODES)
+            if invalid:
+                valid = piece.index(invalid[0])
+                position = len(self) + size + valid
+                self._error = f"Unexpected '{chr(invalid[0])}' at position {position} of the commands."
+                self.exhausted = True
+                pieces.append(piece[:valid])
+                break
+            pieces.append(piece)
+            size += len(piece)
+        return b"".join(pieces)
+
+    def __reduce__(self):
+        raise TypeError("Streamed commands cannot be pickled, they are read as they run.")
+
+
+def count_command(program, code: int, start: int = 0) -> int:
+    """
+    Number of steps from start on that execute the command code, for a Program or plain command bytes.
+    """
+    if isinstance(program, Program):
+        return program.count(code, start)
+    if isinstance(program, bytes):
+        return program.count(code, start)
+    return bytes(program[start:]).count(code)
+
+
+_TURN_MASK = bytes(1 if code in _TURN_CODES else 0 for code in range(256))
+
+
+def find_turns(program, length: int, start: int = 0, limit: int = 256) -> int:
+    """
+    Index of the first stretch of at least `length` turns in a row at or after start,
+    -1 if there is none. Plain command bytes are searched a bounded window at a time, at
+    C speed, and a Program is only walked for about `limit` runs: when nothing is found
+    in that stretch, the index reached is returned, for the caller to look again from there.
+    """
+    if not isinstance(program, Program):
+        # No mask of the whole program is built (or kept), whatever its length
+        mask = bytes(program[start:start + WINDOW_SIZE]).translate(_TURN_MASK)
+        found = mask.find(b"\1" * length)
+        if found >= 0:
+            return start + found
+        if start + len(mask) < len(program):
+            return start + max(len(mask) - length + 1, 1)
+        return -1
+    index = turns_start = start
+    turns = 0
+    for k, (code, count) in enumerate(program.runs(start)):
+        if code in _TURN_CODES:
+            if not turns:
+                turns_start = index
+            turns += count
+            if turns >= length:
+                return turns_start
+        else:
+            turns = 0
+            if k >= limit:
+                return index
+        index += count
+    return -1
+
+
+def iter_runs(program, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    Walk the steps [start, stop) of a Program or of plain command bytes as (code, count) runs.
+    """
+    if isinstance(program, Program):
+        yield from program.runs(start, stop)
+        return
+    if isinstance(program, CommandStream):
+        raise ValueError(_STREAMED)
+    code, count = None, 0
+    for c in program[start:stop]:
+        if c == code:
+            count += 1
+            continue
+        if count:
+            yield code, count
+        code, count = c, 1
+    if count:
+        yield code, count
+
+
+def expand(program) -> bytes:
+    """
+    Plain command bytes of a Program or of plain command bytes.
+    """
+    if isinstance(program, CommandStream):
+        raise ValueError(_STREAMED)
+    return program.expand() if isinstance(program, Program) else bytes(program)
+
+
+# Deepest nesting of groups parse_program accepts
+MAX_NESTING = 100
+
+
+def parse_program(source: str) -> Program:
+    """
+    Parse a compressed command program.
+
+    A command or a parenthesised group may be followed by a repeat count, written
+    either right after it or after a '*': "F1000", "L*3", "(FFR)*250", "((FL)2R)10".
+
+    Raises:
+        ValueError if the program is malformed, nests groups more than MAX_NESTING deep
+        or has more steps than len can count.
+    """
+    nodes, position = _parse_sequence(source, 0, 0)
+    if position != len(source):
+        raise ValueError(f"Unexpected ')' at position {position} of the commands.")
+    program = Program(source, nodes)
+    if program.offsets[-1] > sys.maxsize:
+        raise ValueError("Commands repeat too many times.")
+    return program
+
+
+def _parse_sequence(source: str, position: int, depth: int) -> Tuple[List[Node], int]:
+    if depth > MAX_NESTING:
+        # Parsing, and walking the program later on, recurse once per level
+        raise ValueError("Commands are nested too deeply.")
+    nodes: List[Node] = []
+    while position < len(source):
+        char = source[position]
+        if char in "FLR":
+            atom: Node = (ord(char), 1)
+            position += 1
+        elif char == "(":
+            body, position = _parse_sequence(source, position + 1, depth + 1)
+            if position >= len(source) or source[position] != ")":
+                raise ValueError("Unbalanced '(' in the commands.")
+            atom = Loop(body, 1)
+            position += 1
+        elif char == ")":
+            break
+        else:
+            raise ValueError(f"Unexpected '{char}' at position {position} of the commands.")
+
+        times, position = _parse_count(source, position)
+        _append(nodes, atom, times)
+    return nodes, position
+
+
+def _parse_count(source: str, position: int) -> Tuple[int, int]:
+    star = position < len(source) and source[position] == "*"
+    end = position + star
+    while end < len(source) and source[end].isdigit():
+        end += 1
+    digits = source[position + star:end]
+    if not digits:
+        if star:
+            raise ValueError(f"Missing repeat count after '*' at position {position} of the commands.")
+        return 1, position
+    return int(digits), end
+
+
+def _append(nodes: List[Node], atom: Node, times: int) -> None:
+    """
+    Add atom repeated `times` times, merging runs of one command and
+    flattening groups that hold a single run or are not repeated.
+    """
+    if isinstance(atom, Loop):
+        if len(atom.body) == 1 and not isinstance(atom.body[0], Loop):
+            atom = atom.body[0]
+        elif times == 1:
+            for node in atom.body:
+                _append(nodes, node, 1)
+            return
+        else:
+            if atom.body_length and times:
+                nodes.append(Loop(atom.body, times))
+            return
+    code, count = atom
+    count *= times
+    if not count:
+        return
+    if nodes and not isinstance(nodes[-1], Loop) and nodes[-1][0] == code:
+        nodes[-1] = (code, nodes[-1][1] + count)
+    else:
+        nodes.append((code, count))
+
+
+def compile_commands(commands: str):
+    """
+    Turn a command string into what a Car executes.
+
+    Plain strings stay plain ASCII bytes (unknown letters, ASCII or not, are ignored
+    when executed, as they always were). Strings with counts or groups become a Program.
+    Short programs are interned: cars given the same string share one compiled program,
+    which also lets the trajectory cache (see app.trajectory) recognise them cheaply.
+    Longer ones are compiled every time, so the cache never holds on to large programs.
+    """
+    if len(commands) <= INTERN_MAX_LENGTH:
+        return _compile_interned(commands)
+    return _compile(commands)
+
+
+def _compile(commands: str):
+    if not any(c.isdigit() or c in "()*" for c in commands):
+        # Non-ASCII characters become "?", still one step each that does nothing
+        return commands.encode("ascii", errors="replace")
+    return parse_program(commands)
+
+
+_compile_interned = lru_cache(maxsize=4096)(_compile)
+
+
+def validate_commands(commands: str) -> None:
+    """
+    Check a command string typed by a user, plain or compressed.
+
+    Raises:
+        ValueError with a user-facing message.
+    """
+    if not set(commands) <= _SYNTAX:
+        raise ValueError("Commands must only contain F, L, R.")
+    compile_commands(commands)
@@ -0,0 +1,254 @@
+import struct
+import tempfile
+from array import array
+from bisect import bisect_right
+from typing import List, Dict, Tuple, Optional, Union, BinaryIO
+
+from app.car import Car
+from app.constants import DIRECTIONS, HEADING_MOVES
+
+# start step, steps, car count, change count
+CHUNK_HEADER = struct.Struct("<qqqq")
+# A change is one byte: the new heading in the low two bits, MOVED if the car also
+# went one cell forward along it (a car never turns and moves in the same step)
+MOVED = 4
+
+Pose = Tuple[int, int, str]
+
+
+class _Frames:
+    """
+    Decoded chunk: the keyframe poses at its start step and the changes of every step after.
+    """
+
+    __slots__ = ("start", "xs", "ys", "headings", "offsets", "ids", "changes")
+
+    def __init__(self, start: int, xs: array, ys: array, headings: array,
+                 offsets: array, ids: array, changes: array) -> None:
+        self.start, self.xs, self.ys, self.headings = start, xs, ys, headings
+        self.offsets, self.ids, self.changes = offsets, ids, changes
+
+    @property
+    def steps(self) -> int:
+        return len(self.offsets) - 1
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.xs, self.ys, self.headings, self.offsets, self.ids, self.changes))
+
+    def encode(self) -> bytes:
+        header = CHUNK_HEADER.pack(self.start, self.steps, len(self.xs), len(self.ids))
+        return header + b"".join(
+            a.tobytes() for a in (self.xs, self.ys, self.offsets, self.ids, self.headings, self.changes)
+        )
+
+    @classmethod
+    def decode(cls, data: bytes) -> "_Frames":
+        start, steps, car_count, change_count = CHUNK_HEADER.unpack_from(data)
+        position = CHUNK_HEADER.size
+        parts = []
+        for code, length in (("q", car_count), ("q", car_count), ("q", steps + 1),
+                             ("I", change_count), ("B", car_count), ("B", change_count)):
+            part = array(code)
+            size = length * part.itemsize
+            part.frombytes(data[position:position + size])
+            position += size
+            parts.append(part)
+        xs, ys, offsets, ids, headings, changes = parts
+        return cls(start, xs, ys, headings, offsets, ids, changes)
+
+
+class TrajectoryRecorder:
+    """
+    Records the pose of every car after every step of a run, compactly and seekably.
+
+    A step only stores the cars whose pose changed, one car id and one byte each (see
+    MOVED). Steps are grouped in chunks that start with a keyframe, the full poses at
+    their first step, so the pose at any step is found by decoding one chunk and
+    replaying at most keyframe_every steps of changes.
+
+    Finished chunks are kept in memory as bytes until they exceed memory_limit, then
+    spilled to path (an anonymous temporary file if no path is given). A chunk whose
+    keyframe and changes alone pass half the limit is closed early, so memory stays
+    bounded whatever the fleet size and run length.
+    """
+
+    def __init__(self, keyframe_every: int = 64, memory_limit: int = 64 << 20, path: Optional[str] = None) -> None:
+        """
+        Args:
+            keyframe_every: Maximum number of steps between two keyframes.
+            memory_limit: Bytes of recording kept in memory before spilling to disk.
+            path: File the chunks are spilled to.
+        """
+        if keyframe_every < 1:
+            raise ValueError("keyframe_every must be at least 1.")
+        self.keyframe_every: int = keyframe_every
+        self.memory_limit: int = memory_limit
+        self.path: Optional[str] = path
+        self.names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.first_step: int = 0
+        self.last_step: int = 0
+        # Per chunk: its start step, and its bytes or its (offset, length) in the spill file
+        self._starts: List[int] = []
+        self._chunks: List[Union[bytes, Tuple[int, int]]] = []
+        self._in_memory: int = 0
+        self._spill: Optional[BinaryIO] = None
+        self._current: Optional[_Frames] = None
+        self._cached: Tuple[int, Optional[_Frames]] = (-1, None)
+        # Pose of every car at the last recorded step
+        self._xs = array("q")
+        self._ys = array("q")
+        self._headings = array("B")
+
+    def begin(self, cars: List[Car], step: int = 0) -> None:
+        """
+        Start a new recording from the current poses of cars, dropping any earlier one.
+        """
+        self.close()
+        self.names = [car.name for car in cars]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.first_step = self.last_step = step
+        self._starts, self._chunks, self._in_memory = [], [], 0
+        self._xs = array("q", (car.x for car in cars))
+        self._ys = array("q", (car.y for car in cars))
+        self._headings = array("B", (car.heading for car in cars))
+        self._open_chunk()
+
+    def record(self, cars: List[Car], car_ids: List[int]) -> None:
+        """
+        Record the step just made. Only car_ids (the cars that were stepped) can have changed.
+        """
+        frames = self._current
+        xs, ys, headings = self._xs, self._ys, self._headings
+        for i in car_ids:
+            car = cars[i]
+            if car.x != xs[i] or car.y != ys[i]:
+                xs[i], ys[i] = car.x, car.y
+                frames.ids.append(i)
+                frames.changes.append(car.heading | MOVED)
+            elif car.heading != headings[i]:
+                headings[i] = car.heading
+                frames.ids.append(i)
+                frames.changes.append(car.heading)
+        frames.offsets.append(len(frames.ids))
+        self.last_step += 1
+
+        if frames.steps >= self.keyframe_every or frames.nbytes() * 2 >= self.memory_limit:
+            self._seal()
+            self._open_chunk()
+
+    def poses(self, step: int) -> Dict[str, Pose]:
+        """
+        Pose (x, y, direction) of every car after the given step.
+
+        Raises:
+            ValueError if the step was not recorded.
+        """
+        xs, ys, headings = self._replay(step)
+        return {name: (xs[i], ys[i], DIRECTIONS[headings[i]]) for i, name in enumerate(self.names)}
+
+    def pose(self, name: str, step: int) -> Pose:
+        """
+        Pose (x, y, direction) of one car after the given step.
+
+        Raises:
+            ValueError if the car or the step was not recorded.
+        """
+        if name not in self._index:
+            raise ValueError(f"Car with name '{name}' was not recorded.")
+        i = self._index[name]
+        frames = self._locate(step)
+        x, y, heading = frames.xs[i], frames.ys[i], frames.headings[i]
+        ids, changes = frames.ids, frames.changes
+        for j in range(frames.offsets[step - frames.start]):
+            if ids[j] == i:
+                heading = changes[j] & 3
+                if changes[j] & MOVED:
+                    dx, dy = HEADING_MOVES[heading]
+                    x, y = x + dx, y + dy
+        return x, y, DIRECTIONS[heading]
+
+    def nbytes(self) -> int:
+        """
+        Bytes of recording currently held in memory.
+        """
+        return self._in_memory + (self._current.nbytes() if self._current else 0)
+
+    def close(self) -> None:
+        """
+        Close the spill file. The recording can no longer be read from disk afterwards.
+        """
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._cached = (-1, None)
+
+    def _open_chunk(self) -> None:
+        self._current = _Frames(self.last_step, array("q", self._xs), array("q", self._ys),
+                                array("B", self._headings), array("q", [0]), array("I"), array("B"))
+
+    def _seal(self) -> None:
+        """
+        Move the current chunk to the finished ones, spilling those to disk once over the limit.
+        """
+        data = self._current.encode()
+        self._starts.append(self._current.start)
+        self._chunks.append(data)
+        self._in_memory += len(data)
+        self._current = None
+        if self._in_memory > self.memory_limit // 2:
+            self._spill_chunks()
+
+    def _spill_chunks(self) -> None:
+        if self._spill is None:
+            self._spill = open(self.path, "w+b") if self.path else tempfile.TemporaryFile()
+        self._spill.seek(0, 2)
+        for k, chunk in enumerate(self._chunks):
+            if isinstance(chunk, bytes):
+                self._chunks[k] = (self._spill.tell(), len(chunk))
+                self._spill.write(chunk)
+        self._spill.flush()
+        self._in_memory = 0
+
+    def _frames(self, k: int) -> _Frames:
+        """
+        Decoded chunk k, the chunk being recorded when k is past the finished ones.
+        """
+        if k == len(self._chunks):
+            return self._current
+        if self._cached[0] == k:
+            return self._cached[1]
+        chunk = self._chunks[k]
+        if not isinstance(chunk, bytes):
+            offset, length = chunk
+            self._spill.seek(offset)
+            chunk = self._spill.read(length)
+        frames = _Frames.decode(chunk)
+        self._cached = (k, frames)
+        return frames
+
+    def _locate(self, step: int) -> _Frames:
+        """
+        Chunk holding the given step.
+        """
+        if not self.first_step <= step <= self.last_step:
+            raise ValueError(f"Step {step} was not recorded (steps {self.first_step} to {self.last_step}).")
+        if step >= self._current.start:
+            return self._current
+        return self._frames(bisect_right(self._starts, step) - 1)
+
+    def _replay(self, step: int) -> Tuple[array, array, array]:
+        """
+        Poses of all cars after step: the keyframe of its chunk with the following changes applied.
+        """
+        frames = self._locate(step)
+        xs, ys, headings = array("q", frames.xs), array("q", frames.ys), array("B", frames.headings)
+        ids, changes = frames.ids, frames.changes
+        for j in range(frames.offsets[step - frames.start]):
+            i, change = ids[j], changes[j]
+            heading = headings[i] = change & 3
+            if change & MOVED:
+                dx, dy = HEADING_MOVES[heading]
+                xs[i] += dx
+                ys[i] += dy
+        return xs, ys, headings
@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO, Union
+
+from app.car import Car
+from app.constants import DIRECTIONS, HEADINGS
+from app.sinks import CSV_COLUMNS
+
+MAGIC = b"ADRESLT1"
+VERSION = 1
+# magic, version, row_count, name_count, partner_count, name_bytes
+HEADER = struct.Struct("<8sIqqqq")
+STATUSES = ("completed", "collided")
+COMPLETED, COLLIDED = 0, 1
+
+
+def _pad(size: int) -> int:
+    """Round size up so that every section starts 8-byte aligned."""
+    return (size + 7) & ~7
+
+
+class RunResult(Sequence):
+    """
+    Columnar result of a run, see Simulation.run_all(columnar=True).
+
+    One row per run_all entry, in the same order, kept as flat arrays instead of three
+    dicts per car: the car (an index into names), final x / y / heading, status and
+    collision step (-1 when the car completed). Collision partners are stored CSR-style,
+    the partners of row r being partners[partner_offsets[r]:partner_offsets[r + 1]].
+    A collided car is frozen where it was hit, so its final cell is its collision cell.
+
+    It reads as the list of run_all entries: indexing or iterating builds each entry dict
+    on demand, so code written against run_all (such as SimulationCLI) works unchanged.
+    """
+
+    def __init__(self, names: List[str]) -> None:
+        self.names: List[str] = names
+        self.car = array("q")
+        self.x = array("q")
+        self.y = array("q")
+        self.heading = array("B")
+        self.status = array("B")
+        self.collision_step = array("q")
+        self.partner_offsets = array("q", [0])
+        self.partners = array("q")
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]], names: Optional[List[str]] = None) -> "RunResult":
+        """
+        Columnar copy of run_all entries, from any engine. Names default to the entry order.
+        """
+        entries = list(entries)
+        result = cls(names if names is not None else [entry["name"] for entry in entries])
+        for entry in entries:
+            result.add_entry(entry)
+        return result
+
+    def add_entry(self, entry: Dict[str, Any]) -> None:
+        """
+        Append a run_all entry.
+        """
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self.names)}
+        final = entry["final"]
+        row = self._append(self._index[entry["name"]], final["x"], final["y"], HEADINGS[final["direction"]])
+        collision = entry["collision"]
+        if collision is not None:
+            self.status[row] = COLLIDED
+            self.collision_step[row] = collision["step"]
+            self.partners.extend(self._index[name] for name in collision["with"])
+            self.partner_offsets[-1] = len(self.partners)
+
+    def add_completed(self, car_id: int, car: Car) -> None:
+        """
+        Append a car that ran out of commands, straight from its state.
+        """
+        self._append(car_id, car.x, car.y, car.heading)
+
+    def _append(self, car_id: int, x: int, y: int, heading: int) -> int:
+        self.car.append(car_id)
+        self.x.append(x)
+        self.y.append(y)
+        self.heading.append(heading)
+        self.status.append(COMPLETED)
+        self.collision_step.append(-1)
+        self.partner_offsets.append(len(self.partners))
+        return len(self.car) - 1
+
+    def __len__(self) -> int:
+        return len(self.car)
+
+    def __getitem__(self, row: Union[int, slice]):
+        if isinstance(row, slice):
+            return [self.entry(r) for r in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("result row out of range")
+        return self.entry(row)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self.entry(row)
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """
+        The run_all entry of a row.
+        """
+        x, y = self.x[row], self.y[row]
+        entry = {
+            "name": self.names[self.car[row]],
+            "final": {"x": x, "y": y, "direction": DIRECTIONS[self.heading[row]]},
+            "status": STATUSES[self.status[row]],
+            "collision": None
+        }
+        if self.status[row] == COLLIDED:
+            entry["collision"] = {
+                "with": [self.names[i] for i in self.partners_of(row)],
+                "at": {"x": x, "y": y},
+                "step": self.collision_step[row]
+            }
+        return entry
+
+    def partners_of(self, row: int) -> array:
+        """
+        Name indices of the cars a row collided with.
+        """
+        return self.partners[self.partner_offsets[row]:self.partner_offsets[row + 1]]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """
+        The entries as the plain list run_all returns by default.
+        """
+        return list(self)
+
+    def write_jsonl(self, stream: TextIO) -> int:
+        """
+        Write one JSON line per row, exactly as JsonlSink writes the entries, without
+        building them: names are quoted once, rows are formatted straight from the arrays.
+        Returns the number of lines written.
+        """
+        quoted = [json.dumps(name) for name in self.names]
+        cars, xs, ys, headings, statuses, steps, offsets, partners = (
+            self.car, self.x, self.y, self.heading, self.status, self.collision_step,
+            self.partner_offsets, self.partners
+        )
+
+        def lines() -> Iterator[str]:
+            for row in range(len(cars)):
+                x, y = xs[row], ys[row]
+                head = f'{{"name": {quoted[cars[row]]}, "final": {{"x": {x}, "y": {y}, ' \
+                       f'"direction": "{DIRECTIONS[headings[row]]}"}}, '
+                if statuses[row] == COMPLETED:
+                    yield head + '"status": "completed", "collision": null}\n'
+                else:
+                    with_ = ", ".join(quoted[i] for i in partners[offsets[row]:offsets[row + 1]])
+                    yield head + f'"status": "collided", "collision": {{"with": [{with_}], ' \
+                                 f'"at": {{"x": {x}, "y": {y}}}, "step": {steps[row]}}}}}\n'
+
+        stream.writelines(lines())
+        return len(cars)
+
+    def write_csv(self, stream: TextIO) -> int:
+        """
+        Write the rows as CSV with the columns of CsvSink (see CSV_COLUMNS), header first.
+        Returns the number of rows written.
+        """
+        names, offsets, partners = self.names, self.partner_offsets, self.partners
+
+        def rows() -> Iterator[tuple]:
+            for row in range(len(self.car)):
+                x, y = self.x[row], self.y[row]
+                if self.status[row] == COMPLETED:
+                    yield names[self.car[row]], "completed", x, y, DIRECTIONS[self.heading[row]], "", "", "", ""
+                else:
+                    with_ = ";".join(names[i] for i in partners[offsets[row]:offsets[row + 1]])
+                    yield (names[self.car[row]], "collided", x, y, DIRECTIONS[self.heading[row]],
+                           self.collision_step[row], x, y, with_)
+
+        writer = csv.writer(stream)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(rows())
+        return len(self.car)
+
+    def save(self, path: str) -> None:
+        """
+        Write the result to a binary columnar file: a header, then every array as is,
+        each section 8-byte aligned, and the names as one UTF-8 blob with their offsets.
+        The file is written next to path and renamed over it.
+        """
+        names = [name.encode("utf-8") for name in self.names]
+        name_offsets = array("q", [0])
+        for name in names:
+            name_offsets.append(name_offsets[-1] + len(name))
+        blob = b"".join(names)
+        sections = [
+            self.car, self.x, self.y, self.collision_step, self.partner_offsets, self.partners,
+            name_offsets, self.heading, self.status, blob,
+        ]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.car), len(names), len(self.partners), len(blob)))
+            for section in sections:
+                data = section.tobytes() if isinstance(section, array) else section
+                f.write(data)
+                f.write(b"\0" * (_pad(len(data)) - len(data)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RunResult":
+        """
+        Read a result written by save.
+
+        Raises:
+            ValueError if the file is not a saved result.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a simulation result.")
+        magic, version, row_count, name_count, partner_count, name_bytes = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a simulation result.")
+
+        view = memoryview(data)
+        position = HEADER.size
+
+        def section(length: int, code: str) -> array:
+            nonlocal position
+            column = array(code)
+            size = length * column.itemsize
+            column.frombytes(view[position:position + size])
+            position += _pad(size)
+            return column
+
+        car, x, y, collision_step = (section(row_count, "q") for _ in range(4))
+        partner_offsets = section(row_count + 1, "q")
+        partners = section(partner_count, "q")
+        name_offsets = section(name_count + 1, "q")
+        heading, status = section(row_count, "B"), section(row_count, "B")
+        blob = bytes(view[position:position + name_bytes])
+
+        result = cls([str(blob[name_offsets[i]:name_offsets[i + 1]], "utf-8") for i in range(name_count)])
+        result.car, result.x, result.y, result.heading, result.status = car, x, y, heading, status
+        result.collision_step, result.partner_offsets, result.partners = collision_step, partner_offsets, partners
+        return result
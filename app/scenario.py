@@ -0,0 +1,80 @@
+from typing import List, Dict, Tuple, Any, Iterable
+
+from app.constants import DIRECTIONS
+from app.field import Field
+from app.program import validate_commands
+
+# One car as accepted by Simulation.add_cars: (name, x, y, direction, commands)
+CarRow = Tuple[str, int, int, str, str]
+
+
+def parse_car_line(line: str) -> CarRow:
+    """
+    Parse a "name x y D commands" line, with the same checks as the interactive CLI.
+    The commands may be omitted for a car that never moves.
+    """
+    parts = line.split()
+    if len(parts) not in (4, 5):
+        raise ValueError("Invalid input. Format must be: name x y D commands (e.g., A 1 2 N FFRL)")
+    name, x_str, y_str, direction = parts[:4]
+    commands = parts[4].upper() if len(parts) == 5 else ""
+    try:
+        x, y = int(x_str), int(y_str)
+    except ValueError:
+        raise ValueError("Invalid input. Position must be two integers.") from None
+
+    direction = direction.upper()
+    if direction not in DIRECTIONS:
+        raise ValueError("Invalid direction.")
+    validate_commands(commands)
+    return name, x, y, direction, commands
+
+
+def parse_scenario(lines: Iterable[str]) -> Tuple[Field, List[CarRow], List[Tuple[int, str]]]:
+    """
+    Parse a scenario in one pass.
+
+    The first non-blank line holds the field size "width height", every following
+    non-blank line a car "name x y D commands". Lines starting with '#' are comments.
+
+    Returns:
+        The field, the car rows, and (line number, message) for the car lines that were rejected.
+
+    Raises:
+        ValueError if the field line is missing or invalid.
+    """
+    field = None
+    rows: List[CarRow] = []
+    errors: List[Tuple[int, str]] = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if field is None:
+            try:
+                width, height = map(int, line.split())
+            except ValueError:
+                raise ValueError(f"Line {number}: invalid field size, expected two integers.") from None
+            field = Field(width, height)
+            continue
+        try:
+            rows.append(parse_car_line(line))
+        except ValueError as e:
+            errors.append((number, str(e)))
+
+    if field is None:
+        raise ValueError("Scenario is empty, expected the field size on the first line.")
+    return field, rows, errors
+
+
+def scenario_from_dict(scenario: Dict[str, Any]) -> Tuple[Field, List[CarRow]]:
+    """
+    Read a JSON scenario: {"field": [width, height], "cars": [{"name", "x", "y", "direction", "commands"}]}
+    and optionally "obstacles": [[x, y], ...]
+    """
+    width, height = scenario["field"]
+    rows = [
+        (car["name"], car["x"], car["y"], car["direction"], car.get("commands", ""))
+        for car in scenario["cars"]
+    ]
+    return Field(width, height, scenario.get("obstacles")), rows
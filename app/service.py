@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import aclosing
+from itertools import count
+from typing import List, Dict, Any, Optional, AsyncIterator, Set
+
+from app.scenario import scenario_from_dict
+from app.simulation import Simulation
+
+# Longest JSON line accepted from a worker or a client
+LINE_LIMIT = 1 << 24
+
+
+class WorkerPool:
+    """
+    A fixed number of long-lived worker processes running scenarios one at a time.
+
+    Workers are `python -m app.service --worker` processes reading one JSON scenario
+    per line on stdin and writing its events as JSON lines on stdout, so events reach
+    the service as they are produced. A job that is cancelled or times out has its
+    worker killed and replaced, which stops even a run that never yields an event.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.size: int = workers or os.cpu_count() or 1
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.subprocess.Process] = []
+
+    async def start(self) -> None:
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._spawn())
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            if worker.returncode is None:
+                worker.kill()
+                await worker.wait()
+        self._workers = []
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        worker = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.service", "--worker",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=LINE_LIMIT
+        )
+        self._workers.append(worker)
+        return worker
+
+    async def _replace(self, worker: asyncio.subprocess.Process) -> asyncio.subprocess.Process:
+        if worker.returncode is None:
+            worker.kill()
+        await worker.wait()
+        self._workers.remove(worker)
+        return await self._spawn()
+
+    async def run(self, scenario: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a scenario on the next idle worker and yield its messages, the last one
+        holding "done" or "error".
+        """
+        worker = await self._idle.get()
+        finished = False
+        try:
+            worker.stdin.write(json.dumps(scenario).encode() + b"\n")
+            await worker.stdin.drain()
+            while True:
+                line = await worker.stdout.readline()
+                if not line:
+                    raise RuntimeError("Worker process exited.")
+                message = json.loads(line)
+                yield message
+                if "done" in message or "error" in message:
+                    finished = True
+                    return
+        finally:
+            if not finished:
+                worker = await asyncio.shield(self._replace(worker))
+            self._idle.put_nowait(worker)
+
+
+def _worker_main() -> None:
+    """
+    Worker process loop: one JSON scenario per stdin line, its events as JSON lines on stdout.
+    """
+    for line in sys.stdin:
+        try:
+            field, rows = scenario_from_dict(json.loads(line))
+        except (KeyError, TypeError, ValueError) as e:
+            print(json.dumps({"error": f"Invalid scenario: {e}"}), flush=True)
+            continue
+        sim = Simulation(field)
+        errors = [{"row": row, "error": message} for row, message in sim.add_cars(rows)]
+        for entry in sim.iter_events():
+            print(json.dumps({"event": entry}), flush=True)
+        print(json.dumps({"done": True, "errors": errors}), flush=True)
+
+
+class SimulationService:
+    """
+    Local asyncio service running scenarios on a WorkerPool.
+
+    Clients connect over TCP or a Unix socket and speak JSON lines:
+    - {"id": "s1", "field": [w, h], "cars": [...], "timeout": 5} submits a scenario
+      (id and timeout are optional, timeout is a positive number of seconds or null for no limit)
+    - {"cancel": "s1"} cancels a scenario of this client
+    and receive, per scenario, {"id", "event"} lines as the run produces them, then
+    {"id", "done": true, "errors"} or {"id", "error"}.
+
+    Backpressure: at most queue_size scenarios are admitted (queued or running) at a
+    time; past that the service stops reading requests until one finishes, so clients
+    are held back by their socket. A slow reader in turn holds back its own worker.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: int = 64, timeout: Optional[float] = None) -> None:
+        """
+        Args:
+            workers: Worker processes, defaults to the number of CPUs.
+            queue_size: Scenarios admitted at once, over all clients.
+            timeout: Default time limit of a scenario in seconds, None for no limit.
+        """
+        self.pool: WorkerPool = WorkerPool(workers)
+        self.queue_size: int = queue_size
+        self.timeout: Optional[float] = timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._servers: List[asyncio.AbstractServer] = []
+        self._ids = count(1)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """
+        Start the workers and listen on a Unix socket at path, or on TCP host:port.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.queue_size)
+            await self.pool.start()
+        if path:
+            server = await asyncio.start_unix_server(self._serve_client, path=path, limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self._serve_client, host, port, limit=LINE_LIMIT)
+        self._servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        await self.pool.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        jobs: Dict[Any, asyncio.Task] = {}
+        # Replies sent on behalf of jobs cancelled before they started
+        replies: Set[asyncio.Task] = set()
+        lock = asyncio.Lock()
+
+        async def send(message: Dict[str, Any]) -> None:
+            async with lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        def finished(job: asyncio.Task, job_id: Any) -> None:
+            # The slot goes with the task: a task cancelled before it ran never enters _run_job
+            jobs.pop(job_id, None)
+            self._slots.release()
+            if job.cancelled():
+                reply = asyncio.create_task(self._send_error(send, job_id, "Cancelled."))
+                replies.add(reply)
+                reply.add_done_callback(replies.discard)
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    await send({"id": None, "error": f"Invalid request: {e}"})
+                    continue
+
+                if "cancel" in request:
+                    job = jobs.get(request["cancel"])
+                    if job is not None:
+                        job.cancel()
+                    continue
+
+                job_id = request.get("id")
+                if job_id is None:
+                    job_id = request["id"] = next(self._ids)
+                if job_id in jobs:
+                    await send({"id": job_id, "error": f"Scenario '{job_id}' is already running."})
+                    continue
+                timeout = request.get("timeout")
+                if timeout is not None and (type(timeout) not in (int, float) or not timeout > 0):
+                    await send({"id": job_id, "error": "Invalid request: timeout must be a positive number of seconds."})
+                    continue
+                # Requests are not read any further while the service is full
+                await self._slots.acquire()
+                job = asyncio.create_task(self._run_job(request, send))
+                jobs[job_id] = job
+                job.add_done_callback(lambda job, job_id=job_id: finished(job, job_id))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # A client that disconnects takes its scenarios with it
+            for job in list(jobs.values()):
+                job.cancel()
+            await asyncio.gather(*jobs.values(), return_exceptions=True)
+            await asyncio.gather(*replies, return_exceptions=True)
+            writer.close()
+
+    async def _run_job(self, request: Dict[str, Any], send) -> None:
+        job_id = request["id"]
+        timeout = request.get("timeout", self.timeout)
+        error = None
+        try:
+            async with asyncio.timeout(timeout):
+                async with aclosing(self.pool.run(request)) as messages:
+                    async for message in messages:
+                        await send(dict(message, id=job_id))
+        except TimeoutError:
+            error = f"Timed out after {timeout} s."
+        except asyncio.CancelledError:
+            error = "Cancelled."
+        except (ConnectionError, RuntimeError) as e:
+            error = str(e)
+        if error is not None:
+            await self._send_error(send, job_id, error)
+
+    @staticmethod
+    async def _send_error(send, job_id: Any, error: str) -> None:
+        try:
+            await send({"id": job_id, "error": error})
+        except ConnectionError:
+            pass
+
+
+class ServiceClient:
+    """
+    Minimal client of SimulationService, used by the tests and handy from scripts.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self._queues: Dict[Any, asyncio.Queue] = {}
+        self._listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None) -> "ServiceClient":
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def submit(self, scenario: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Submit a scenario (it must have an "id") and yield its messages until the last one.
+        """
+        queue = self._queues[scenario["id"]] = asyncio.Queue()
+        self.writer.write(json.dumps(scenario).encode() + b"\n")
+        await self.writer.drain()
+        try:
+            while True:
+                message = await queue.get()
+                yield message
+                if "done" in message or "error" in message:
+                    return
+        finally:
+            self._queues.pop(scenario["id"], None)
+
+    async def run(self, scenario: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Submit a scenario and collect all its messages.
+        """
+        return [message async for message in self.submit(scenario)]
+
+    async def cancel(self, job_id: Any) -> None:
+        self.writer.write(json.dumps({"cancel": job_id}).encode() + b"\n")
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self._listener.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _listen(self) -> None:
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            queue = self._queues.get(message.get("id"))
+            if queue is not None:
+                queue.put_nowait(message)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    service = SimulationService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout)
+    server = await service.start(args.host, args.port, args.unix)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving simulations on {addresses} with {service.pool.size} workers", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: python -m app.service --port 8765 (or --unix PATH)"""
+    parser = argparse.ArgumentParser(description="Serve simulations over TCP or a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=64, help="Scenarios admitted at once")
+    parser.add_argument("--timeout", type=float, default=None, help="Default time limit of a scenario in seconds")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker_main()
+        return
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,46 @@
-from typing import List, Dict, Tuple, Any, Optional
+import heapq
+import time
+from typing import List, Dict, Tuple, Any, Optional, Iterable, Iterator, Set, Union
 
 from app.car import Car
+from app.constants import DIRECTIONS, HEADING_MOVES
 from app.field import Field
+from app.instrumentation import Instrumentation
+from app.occupancy import Occupancy, choose_occupancy
+from app.program import CommandStream, find_turns
+from app.recorder import TrajectoryRecorder
+from app.results import RunResult
+
+_FORWARD = ord("F")
+# Fewest idle commands ahead worth parking a car for (see Simulation.iter_events)
+FAST_FORWARD_MIN_STEPS = 8
+
+
+class _Run:
+    """
+    State of a run in progress, kept between steps so that it can be advanced piecemeal
+    (see Simulation.step) and cars can join or leave it. Car ids index cars, a car that
+    left keeps its id with None in its place.
+    """
+
+    __slots__ = ("cars", "ids", "occupancy", "movers", "fast_forward", "collided", "parked", "wakes", "spins", "streamed")
+
+    def __init__(self, cars: List[Car], occupancy: Occupancy, movers: List[int], fast_forward: bool) -> None:
+        self.cars: List[Optional[Car]] = cars
+        self.ids: Dict[str, int] = {car.name: i for i, car in enumerate(cars)}
+        self.occupancy: Occupancy = occupancy
+        self.movers: List[int] = movers
+        self.fast_forward: bool = fast_forward
+        # Names of the cars that collided during the run
+        self.collided: Set[str] = set()
+        # Parked car id -> step its pose is up to date with
+        self.parked: Dict[int, int] = {}
+        # Heaps of (step, car id): parked cars moving again in that step, and cars
+        # reaching a run of turns after that step
+        self.wakes: List[Tuple[int, int]] = []
+        self.spins: List[Tuple[int, int]] = []
+        # Ids of the cars reading their commands from a CommandStream
+        self.streamed: Set[int] = {i for i, car in enumerate(cars) if isinstance(car._program, CommandStream)}
 
 
 class Simulation:
@@ -22,28 +61,164 @@ class Simulation:
         self.field: Field = field
         self.cars: Dict[str, Car] = {}
         self.history: List[Dict[str, Any]] = []
+        # State of the run in progress: steps done and collision entries so far
+        self.step_count: int = 0
+        self.collisions: List[Dict[str, Any]] = []
+        # Cell -> number of cars standing on it (several only after a collision), so placement checks are O(1)
+        self._occupancy: Dict[Tuple[int, int], int] = {}
+        # Timers and counters of run_all / iter_events, None (the default) to run uninstrumented
+        self.instrumentation: Optional[Instrumentation] = None
+        # Per-step pose recording of run_all / iter_events, None (the default) to record nothing
+        self.recorder: Optional[TrajectoryRecorder] = None
+        # Let run_all / iter_events jump over the steps in which a car cannot leave its cell.
+        # Off by default: the bookkeeping slows down runs where few cars get stuck
+        self.fast_forward: bool = False
+        # Run in progress, kept between iter_events yields and step / run_until calls
+        self._run: Optional[_Run] = None
+        # Traced and resolved run from the current state, for pose_at and snapshot_at
+        self._pose_index = None
+
+    def instrument(self) -> Instrumentation:
+        """
+        Turn instrumentation on for the following runs.
+
+        Returns:
+            The Instrumentation collecting the timers and counters, kept across runs.
+        """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+        return self.instrumentation
 
-    def add_car(self, name: str, x: int, y: int, direction: str, commands: str) -> None:
+    def record(self, keyframe_every: int = 64, memory_limit: int = 64 << 20,
+               path: Optional[str] = None) -> TrajectoryRecorder:
+        """
+        Record the pose of every car at every step of the following runs (see TrajectoryRecorder).
+        Each run replaces the recording of the previous one.
+
+        Returns:
+            The recorder, to query poses once the run is done.
+        """
+        self.recorder = TrajectoryRecorder(keyframe_every, memory_limit, path)
+        return self.recorder
+
+    def add_car(self, name: str, x: int, y: int, direction: str, commands: Union[str, CommandStream]) -> None:
         """
         Add a car to the simulation with initial position, direction, and movement commands.
+        Commands too long to load whole can be given as a CommandStream, read as the car runs.
 
         Raises Error if:
         - the name exists
         - the position is out of bounds
         - the position is occupied
+        - the position is blocked by an obstacle
+        - the direction is not one of N, E, S, W
+        """
+        self._validate_placement(name, x, y)
+        self._validate_direction(direction)
+
+        car = Car(name, x, y, direction, self.field)
+        car.commands = commands
+        self.cars[name] = car
+        self._occupancy[(x, y)] = 1
+        self._pose_index = None
+        if self._run is not None:
+            self._join_run(self._run, car)
+
+    def add_cars(self, rows: Iterable[Tuple[str, int, int, str, str]]) -> List[Tuple[int, str]]:
         """
-        if any(c.name == name for c in self.cars.values()):
+        Bulk version of add_car, validating the whole batch in one pass.
+
+        Valid rows are added, invalid rows are skipped. A row clashing with an earlier
+        row of the same batch is rejected like a clash with an existing car.
+
+        Args:
+            rows: Iterable of (name, x, y, direction, commands) tuples.
+
+        Returns:
+            List of (row number, error message) for the rejected rows, empty if all were added.
+        """
+        errors: List[Tuple[int, str]] = []
+        for row_number, row in enumerate(rows):
+            try:
+                name, x, y, direction, commands = row
+                self.add_car(name, x, y, direction, commands)
+            except (TypeError, ValueError) as e:
+                errors.append((row_number, str(e)))
+        return errors
+
+    def remove_car(self, name: str) -> None:
+        """
+        Remove a car from the simulation.
+
+        Raises Error if:
+        - the car does not exist
+        - the car collided, or was hit, in the run in progress (see step)
+        """
+        car = self.cars.get(name)
+        if car is None:
+            raise ValueError(f"Car with name '{name}' does not exist.")
+        if self._run is not None:
+            self._leave_run(self._run, car)
+        del self.cars[name]
+        # A run in progress keeps its own occupancy, the index is rebuilt when it ends
+        count = self._occupancy.get(car.position(), 0) if self._run is None else 0
+        if count > 1:
+            self._occupancy[car.position()] = count - 1
+        elif count:
+            del self._occupancy[car.position()]
+        self._pose_index = None
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        """
+        Check whether a car currently stands on (x, y).
+        """
+        if self._run is not None:
+            occupancy = self._run.occupancy
+            return bool(occupancy.occupants(occupancy.key(x, y)))
+        return (x, y) in self._occupancy
+
+    def _validate_placement(self, name: str, x: int, y: int) -> None:
+        """
+        Raise ValueError if a car called name cannot be placed on (x, y).
+        """
+        if name in self.cars:
             raise ValueError(f"Car with name '{name}' already exists.")
 
+        self._validate_cell(x, y)
+
+        if self.is_occupied(x, y):
+            raise ValueError(f"Position ({x}, {y}) is already occupied by another car.")
+
+        if self._run is not None and self.recorder is not None:
+            raise ValueError("Cars cannot join a run that is being recorded.")
+
+    def _validate_cell(self, x: int, y: int) -> None:
+        """
+        Raise ValueError if no car can stand on (x, y): outside the field or on an obstacle.
+        """
         if not self.field.is_within_bounds(x, y):
             raise ValueError(f"Initial position ({x}, {y}) is outside the field bounds.")
 
-        if any((car.x, car.y) == (x, y) for car in self.cars.values()):
-            raise ValueError(f"Position ({x}, {y}) is already occupied by another car.")
+        if self.field.is_blocked(x, y):
+            raise ValueError(f"Position ({x}, {y}) is blocked by an obstacle.")
 
-        car = Car(name, x, y, direction, self.field)
-        car.commands = commands
-        self.cars[name] = car
+    @staticmethod
+    def _validate_direction(direction: str) -> None:
+        """
+        Raise ValueError if direction is not one of DIRECTIONS.
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Invalid direction '{direction}'.")
+
+    def _reindex(self) -> None:
+        """
+        Rebuild the occupancy index after cars have moved.
+        """
+        occupancy: Dict[Tuple[int, int], int] = {}
+        for car in self.cars.values():
+            position = car.position()
+            occupancy[position] = occupancy.get(position, 0) + 1
+        self._occupancy = occupancy
 
     def list_cars(self) -> List[Tuple[str, Tuple[int, int, str], str]]:
         """
@@ -54,73 +229,563 @@ class Simulation:
         """
         return [(c.name, c.posture(), c.commands) for c in self.cars.values()]
 
-    def run_all(self) -> List[Dict[str, Any]]:
+    def pose_at(self, name: str, step: int) -> Tuple[int, int, str]:
+        """
+        Pose (x, y, direction) the car would have after `step` steps of run_all, without running it.
+
+        The first query traces every car once, in closed form over runs of commands, and
+        resolves the collision schedule (see TrajectoryEngine); later queries are bisects
+        into that data. Adding or removing a car, or running, drops it. Cars are left untouched.
+
+        Raises Error if:
+        - the car does not exist
+        - the step is negative
+        """
+        return self._poses().pose_at(name, step)
+
+    def snapshot_at(self, step: int) -> Dict[str, Tuple[int, int, str]]:
+        """
+        Pose (x, y, direction) of every car after `step` steps of run_all, without running it.
+        See pose_at.
+        """
+        return self._poses().snapshot_at(step)
+
+    def _poses(self):
+        if self._pose_index is None:
+            from app.trajectory import TrajectoryEngine
+            self._pose_index = TrajectoryEngine(self)
+        return self._pose_index
+
+    def run_all(self, columnar: bool = False) -> Union[List[Dict[str, Any]], RunResult]:
         """
         Runs the full simulation for all cars step by step until all commands are exhausted or cars are frozen due to collisions.
 
+        A run in progress (see step and run_until) is finished, its earlier collision
+        entries included, so the result is the same as running it in one go.
+
+        Args:
+            columnar: Return a RunResult, the same entries kept as flat arrays and read
+                as dicts on demand, with fast JSONL, CSV and binary exports.
+
         Returns:
             List of dictionaries summarising each car's final state and any collisions.
         """
-        step = 0
-        history: List[Dict[str, Any]] = []
-        active_cars = list(self.cars.values())
+        # Nobody looks at the cars before the run ends, parked cars are caught up only then
+        if not columnar:
+            return list(self._events(catch_up=False))
+        # Rows of completed cars are written by run car id, a car that left keeps its slot
+        run = self._run if self._run is not None else self._begin_run()
+        result = RunResult([car.name if car is not None else "" for car in run.cars])
+        for entry in self._events(catch_up=False, result=result):
+            result.add_entry(entry)
+        return result
+
+    def iter_events(self, checkpoint_every: int = 0, checkpoint_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run the simulation lazily, yielding the run_all entries as soon as they are known.
+
+        Collision entries are yielded at the step they happen. A car that ran out of
+        commands can still be hit while parked, so completion entries are only final,
+        and yielded, once no car can move any more.
+
+        Only the cars that can still move are stepped, and the occupancy is kept across
+        steps: a step only touches the cells that movers left or entered.
+
+        With fast_forward on, a car whose next commands cannot take it off its cell (turns,
+        forwards into the edge or an obstacle) is parked for those steps: it stays in the
+        occupancy as a target, and its turns are applied in closed form when it is hit or
+        starts moving again. Steps in which no car moves are jumped over, and the run ends
+        as soon as nothing can move any more. Parked cars are caught up before every yield,
+        so the cars always match step_count between events. Recording or checkpointing
+        runs step every car.
+
+        With instrumentation on (see instrument), every step also feeds its timers,
+        counters and callbacks. With a recorder (see record), the poses after every
+        step are recorded.
+
+        The run in progress is kept in step_count and collisions, so a run restored from a
+        checkpoint (see app.checkpoint) continues where it stopped, replaying its earlier
+        collision entries first. So does a run driven by step or run_until.
+
+        Args:
+            checkpoint_every: Save a checkpoint every that many steps, 0 to disable.
+            checkpoint_path: File the checkpoints are written to.
+
+        Yields:
+            Dictionaries in the same format as the entries of run_all.
+        """
+        return self._events(checkpoint_every, checkpoint_path)
 
-        while self._any_car_can_move(active_cars):
-            step += 1
-            self._move_all_cars(active_cars)
-            position_map = self._build_position_map(active_cars)
-            self._detect_collisions(active_cars, position_map, history, step)
+    def step(self) -> List[Dict[str, Any]]:
+        """
+        Advance the run in progress by one step, starting a run if there is none.
 
-        self._log_remaining_cars(active_cars, history)
-        return history
+        Returns:
+            The collision entries of that step.
+        """
+        return self.run_until(self.step_count + 1)
+
+    def run_until(self, step: int) -> List[Dict[str, Any]]:
+        """
+        Advance the run in progress until step_count reaches step, starting a run if there is none.
+
+        The run is stepped as in iter_events, at a cost that follows the cars that can
+        move, and it stays open in between: add_car and remove_car make cars join or
+        leave it, and time goes on even once nothing moves, for cars added later.
+        run_all or iter_events finish it with the same entries as a run made in one go.
+
+        Returns:
+            The collision entries of the steps run, in order.
+
+        Raises Error if the step is behind step_count.
+        """
+        if step < self.step_count:
+            raise ValueError(f"Step {step} is behind the current step {self.step_count}.")
+        self._pose_index = None
+        run = self._run if self._run is not None else self._begin_run()
+        entries: List[Dict[str, Any]] = []
+        while self.step_count < step:
+            collisions = self._step_run(run, step)
+            if collisions is None:
+                self.step_count = step
+                break
+            entries.extend(collisions)
+        self._catch_up()
+        return entries
+
+    def can_move(self) -> bool:
+        """
+        Whether some car can still move: a run (see step) is not over before this is False.
+        """
+        run = self._run
+        if run is None:
+            return any(not car.frozen and car.has_remaining_commands() for car in self.cars.values())
+        while run.wakes and run.wakes[0][1] not in run.parked:
+            heapq.heappop(run.wakes)
+        return bool(run.movers or run.wakes)
 
-    def _any_car_can_move(self, cars: List[Car]) -> bool:
+    def _events(self, checkpoint_every: int = 0, checkpoint_path: Optional[str] = None,
+                catch_up: bool = True, result: Optional[RunResult] = None) -> Iterator[Dict[str, Any]]:
+        """
+        The run of iter_events, catching parked cars up before every yield only if catch_up is set.
+        With a result, the completed cars are added to it instead of being yielded.
+        """
+        if checkpoint_every:
+            from app.checkpoint import save_checkpoint
+
+        self._pose_index = None
+        yield from list(self.collisions)
+        run = self._run if self._run is not None else self._begin_run(checkpointing=bool(checkpoint_every))
+        while True:
+            collisions = self._step_run(run)
+            if collisions is None:
+                break
+            if checkpoint_every and self.step_count % checkpoint_every == 0:
+                save_checkpoint(self, checkpoint_path)
+            if catch_up and collisions and run.parked:
+                self._catch_up()
+            yield from collisions
+        yield from self._finish_run(run, result)
+
+    def _begin_run(self, checkpointing: bool = False) -> _Run:
         """
         Part of run_all helper
+
+        Set up the run from the current state of the cars: the occupancy, the movers, and
+        with fast_forward the cars to park right away.
         """
-        return any(not car.frozen and car.has_remaining_commands() for car in cars)
+        instrumentation = self.instrumentation
+        cars = list(self.cars.values())
+        started = time.perf_counter()
+        occupancy = self._build_occupancy(cars)
+        if instrumentation is not None:
+            instrumentation.add_time("occupancy", started)
+        if self.recorder is not None:
+            self.recorder.begin(cars, self.step_count)
+        fast_forward = self.fast_forward and self.recorder is None and not checkpointing
+        run = _Run(cars, occupancy, self._movable_cars(cars, range(len(cars))), fast_forward)
+        run.collided = {entry["name"] for entry in self.collisions}
+        self._run = run
+        if fast_forward:
+            run.spins = self._spin_schedule(cars, run.movers)
+            if run.spins and run.spins[0][0] <= self.step_count:
+                run.movers = self._movable_cars(cars, run.movers, self._park_idle_cars(run, []))
+        return run
 
-    def _move_all_cars(self, cars: List[Car]) -> None:
+    def _step_run(self, run: _Run, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Part of run_all helper
+
+        Run one step, jumping first over the steps in which no car moves, but not past limit.
+        Returns the collision entries of the step, None if no car moves (before limit).
         """
-        for car in cars:
-            if not car.frozen and car.has_remaining_commands():
-                car.execute_next()
+        if run.wakes:
+            self._wake_parked_cars(run, limit)
+        if not run.movers:
+            return None
+        cars, movers, occupancy, parked = run.cars, run.movers, run.occupancy, run.parked
+        if run.streamed:
+            # Read the next streamed commands before any car moves: an invalid one raises
+            # with the step not started, and again on every retry
+            for i in movers:
+                if i in run.streamed:
+                    cars[i].next_command()
+        instrumentation = self.instrumentation
+        self.step_count += 1
+        collisions: List[Dict[str, Any]] = []
+        blocked: Optional[List[int]] = [] if run.fast_forward else None
+        if instrumentation is None:
+            entered = self._move_all_cars(cars, movers, occupancy, blocked)
+            self._detect_collisions(cars, entered, occupancy, collisions, self.step_count, parked)
+        else:
+            self._instrumented_step(cars, movers, occupancy, collisions, instrumentation, blocked, parked)
+        self.collisions.extend(collisions)
+        if self.recorder is not None:
+            self.recorder.record(cars, movers)
+        parking = None
+        if blocked or run.spins and run.spins[0][0] <= self.step_count:
+            parking = self._park_idle_cars(run, blocked)
+        run.movers = self._movable_cars(cars, movers, parking)
+        if instrumentation is not None:
+            instrumentation.step_done(self.step_count)
+        for entry in collisions:
+            run.collided.add(entry["name"])
+        return collisions
 
-    def _build_position_map(self, cars: List[Car]) -> Dict[Tuple[int, int], List[Car]]:
+    def _finish_run(self, run: _Run, result: Optional[RunResult] = None) -> Iterator[Dict[str, Any]]:
         """
         Part of run_all helper
+
+        Close the run and yield the completion entries, or add them to result.
         """
-        position_map: Dict[Tuple[int, int], List[Car]] = {}
-        for car in cars:
-            pos = car.position()
-            position_map.setdefault(pos, []).append(car)
-        return position_map
+        instrumentation = self.instrumentation
+        # Whatever is still parked never moves again: only its turns are left
+        for i in list(run.parked):
+            car = run.cars[i]
+            self._unpark(car, len(car._program) - car.command_index, run.parked, i)
+        self._run = None
+        self.step_count = 0
+        self.collisions = []
+        self._reindex()
+        collided = run.collided
+        if result is not None:
+            started = time.perf_counter()
+            for i, car in enumerate(run.cars):
+                if car is not None and car.name not in collided:
+                    result.add_completed(i, car)
+            if instrumentation is not None:
+                instrumentation.add_time("history", started)
+            return
+        remaining = (car for car in run.cars if car is not None and car.name not in collided)
+        if instrumentation is None:
+            for car in remaining:
+                yield self._create_history_entry(car, status="completed")
+        else:
+            for car in remaining:
+                started = time.perf_counter()
+                entry = self._create_history_entry(car, status="completed")
+                instrumentation.add_time("history", started)
+                yield entry
+
+    def _join_run(self, run: _Run, car: Car) -> None:
+        """
+        Part of run_all helper
+
+        Bring a car added while a run is in progress into it, on the cell it was placed on.
+        """
+        i = len(run.cars)
+        run.cars.append(car)
+        run.ids[car.name] = i
+        if isinstance(car._program, CommandStream):
+            run.streamed.add(i)
+        run.occupancy.add(run.occupancy.key(car.x, car.y), i)
+        if car.has_remaining_commands():
+            run.movers.append(i)
+            if run.fast_forward:
+                self._schedule_spin(car, i, run.spins)
+
+    def _leave_run(self, run: _Run, car: Car) -> None:
+        """
+        Part of run_all helper
+
+        Take a car removed while a run is in progress out of it, caught up with the current step.
+        """
+        if self.recorder is not None:
+            raise ValueError("Cars cannot leave a run that is being recorded.")
+        # Its collision entry, and those of its partners, name it until the run ends
+        if car.name in run.collided:
+            raise ValueError(f"Car '{car.name}' collided in the run in progress and cannot leave it before it ends.")
+        # A car frozen before the run can still be hit in it
+        if car.frozen and any(car.name in entry["collision"]["with"] for entry in self.collisions):
+            raise ValueError(f"Car '{car.name}' was hit in the run in progress and cannot leave it before it ends.")
+        i = run.ids.pop(car.name)
+        if i in run.parked:
+            self._unpark(car, self.step_count - run.parked[i], run.parked, i)
+        run.occupancy.remove(run.occupancy.key(car.x, car.y), i)
+        run.cars[i] = None
+        run.streamed.discard(i)
+        run.movers = [j for j in run.movers if j != i]
+
+    @staticmethod
+    def _movable_cars(cars: List[Car], car_ids: Iterable[int], parking: Optional[Set[int]] = None) -> List[int]:
+        """
+        Part of run_all helper
+        """
+        if parking:
+            car_ids = [i for i in car_ids if i not in parking]
+        # has_remaining_commands inlined, this runs for every mover at every step
+        return [i for i in car_ids if not cars[i].frozen and cars[i].command_index < len(cars[i]._program)]
+
+    def _spin_schedule(self, cars: List[Car], car_ids: List[int]) -> List[Tuple[int, int]]:
+        """
+        Part of run_all helper
+
+        Heap of (step, car id) of the steps after which each car reaches its next run of turns.
+        """
+        step = self.step_count
+        starts = [(find_turns(cars[i]._program, FAST_FORWARD_MIN_STEPS, cars[i].command_index), i) for i in car_ids]
+        spins = [(step + index - cars[i].command_index, i) for index, i in starts if index >= 0]
+        heapq.heapify(spins)
+        return spins
+
+    def _schedule_spin(self, car: Car, car_id: int, spins: List[Tuple[int, int]], skip: int = 0) -> None:
+        """
+        Part of run_all helper
+
+        Schedule a check of the car for the step its next run of turns (past the next
+        `skip` commands) starts after.
+        """
+        index = find_turns(car._program, FAST_FORWARD_MIN_STEPS, car.command_index + skip)
+        if index >= 0:
+            heapq.heappush(spins, (self.step_count + index - car.command_index, car_id))
+
+    def _park_idle_cars(self, run: _Run, blocked: List[int]) -> Set[int]:
+        """
+        Part of run_all helper
+
+        Check the cars that just pressed against the edge or an obstacle, and those
+        reaching a run of turns, and park the ones whose next commands cannot take them
+        off their cell (see Car.idle_steps), scheduling those that move again later.
+        Returns the cars parked.
+        """
+        cars, parked, wakes, spins = run.cars, run.parked, run.wakes, run.spins
+        step = self.step_count
+        candidates = [(i, False) for i in blocked]
+        while spins and spins[0][0] <= step:
+            candidates.append((heapq.heappop(spins)[1], True))
+        parking = set()
+        for i, spinning in candidates:
+            car = cars[i]
+            if car is None or i in parked or car.frozen or not car.has_remaining_commands():
+                continue
+            steps = car.idle_steps()
+            if steps >= FAST_FORWARD_MIN_STEPS:
+                parked[i] = step
+                parking.add(i)
+                if car.command_index + steps < len(car._program):
+                    heapq.heappush(wakes, (step + steps + 1, i))
+            elif spinning:
+                self._schedule_spin(car, i, spins, skip=1)
+        return parking
+
+    def _wake_parked_cars(self, run: _Run, limit: Optional[int] = None) -> None:
+        """
+        Part of run_all helper
+
+        Bring back the parked cars that move in the coming step, jumping straight to
+        the next such step (or to limit) when no other car moves before.
+        """
+        cars, parked, wakes = run.cars, run.parked, run.wakes
+        # Cars hit while parked are frozen, their wake-ups are void
+        while wakes and wakes[0][1] not in parked:
+            heapq.heappop(wakes)
+        if not run.movers and wakes:
+            wake = wakes[0][0] - 1 if limit is None else min(wakes[0][0], limit) - 1
+            self.step_count = max(self.step_count, wake)
+        while wakes and wakes[0][0] <= self.step_count + 1:
+            _, i = heapq.heappop(wakes)
+            if i in parked:
+                car = cars[i]
+                self._unpark(car, self.step_count - parked[i], parked, i)
+                self._schedule_spin(car, i, run.spins)
+                run.movers.append(i)
+
+    def _catch_up(self) -> None:
+        """
+        Bring the cars parked by a run in progress up to date with its current step,
+        leaving them parked, so the state of every car matches step_count.
+        """
+        if self._run is None:
+            return
+        cars, parked = self._run.cars, self._run.parked
+        for i, since in parked.items():
+            steps = cars[i].skip_idle(self.step_count - since)
+            parked[i] = self.step_count
+            if self.instrumentation is not None:
+                self.instrumentation.counters["skipped"] += steps
+
+    def _unpark(self, car: Car, steps: int, parked: Dict[int, int], car_id: int) -> None:
+        """
+        Part of run_all helper
+
+        Catch a parked car up with the steps it was parked for.
+        """
+        del parked[car_id]
+        steps = car.skip_idle(steps)
+        if self.instrumentation is not None:
+            self.instrumentation.counters["skipped"] += steps
+
+    @staticmethod
+    def _move_all_cars(
+        cars: List[Car],
+        car_ids: List[int],
+        occupancy: Occupancy,
+        blocked: Optional[List[int]] = None
+    ) -> List[int]:
+        """
+        Part of run_all helper
+
+        Moves the cars and updates their cells in the occupancy, collecting in blocked
+        (if given) the cars that neither moved nor turned, pressing against the edge or an obstacle.
+        Returns the keys of the cells entered during this step, the only ones where a collision can appear.
+        """
+        entered: Dict[int, None] = {}
+        # Keys are linear in x and y: a move adds the key of its (dx, dy) to the cell key
+        key_moves = [occupancy.key(dx, dy) for dx, dy in HEADING_MOVES]
+        for i in car_ids:
+            car = cars[i]
+            old_x, old_y, old_heading = car.x, car.y, car.heading
+            car.execute_next()
+            if car.x != old_x or car.y != old_y:
+                old_key = occupancy.key(old_x, old_y)
+                key = old_key + key_moves[car.heading]
+                occupancy.remove(old_key, i)
+                occupancy.add(key, i)
+                entered[key] = None
+            elif blocked is not None and car.heading == old_heading:
+                blocked.append(i)
+        return list(entered)
+
+    def _instrumented_step(
+        self,
+        cars: List[Car],
+        car_ids: List[int],
+        occupancy: Occupancy,
+        history: List[Dict[str, Any]],
+        instrumentation: Instrumentation,
+        blocked: Optional[List[int]] = None,
+        parked: Optional[Dict[int, int]] = None
+    ) -> None:
+        """
+        Part of run_all helper
+
+        One step, as _move_all_cars then _detect_collisions, timing each phase and
+        counting what every mover did.
+        """
+        counters = instrumentation.counters
+        started = time.perf_counter()
+        entered: Dict[int, None] = {}
+        for i in car_ids:
+            car = cars[i]
+            old_x, old_y, old_heading = car.x, car.y, car.heading
+            code = car.next_command()
+            car.execute_next()
+            if car.x != old_x or car.y != old_y:
+                key = occupancy.key(car.x, car.y)
+                occupancy.remove(occupancy.key(old_x, old_y), i)
+                occupancy.add(key, i)
+                entered[key] = None
+                counters["moves"] += 1
+            elif car.heading != old_heading:
+                counters["turns"] += 1
+            else:
+                if code == _FORWARD:
+                    counters["blocked"] += 1
+                if blocked is not None:
+                    blocked.append(i)
+        started = instrumentation.add_time("move", started)
+
+        collided = self._find_collisions(cars, list(entered), occupancy)
+        counters["cells_checked"] += len(entered)
+        counters["collisions"] += len(collided)
+        started = instrumentation.add_time("collisions", started)
+
+        self._log_collisions(collided, history, self.step_count, parked)
+        instrumentation.add_time("history", started)
+
+    def _build_occupancy(self, cars: List[Car]) -> Occupancy:
+        """
+        Part of run_all helper
+        """
+        occupancy = choose_occupancy(self.field, len(cars))
+        for i, car in enumerate(cars):
+            occupancy.add(occupancy.key(car.x, car.y), i)
+        return occupancy
 
     def _detect_collisions(
         self,
         cars: List[Car],
-        position_map: Dict[Tuple[int, int], List[Car]],
+        cell_keys: List[int],
+        occupancy: Occupancy,
         history: List[Dict[str, Any]],
-        step: int
+        step: int,
+        parked: Optional[Dict[int, int]] = None
     ) -> None:
         """
         Part of run_all helper
+
+        Parked and frozen cars stay in the occupancy, so they still count as occupants.
+        Collisions of one step are logged in insertion order of the cars.
         """
-        for car in cars:
-            if car.frozen:
+        self._log_collisions(self._find_collisions(cars, cell_keys, occupancy), history, step, parked)
+
+    @staticmethod
+    def _find_collisions(
+        cars: List[Car],
+        cell_keys: List[int],
+        occupancy: Occupancy
+    ) -> List[Tuple[int, Car, List[Car]]]:
+        """
+        Part of run_all helper
+
+        Returns (car id, car, occupants of its cell) for every car not yet frozen
+        standing on a shared cell among cell_keys.
+        """
+        collided = []
+        for key in cell_keys:
+            if not occupancy.is_shared(key):
                 continue
-            pos = car.position()
-            occupants = position_map[pos]
-            if len(occupants) > 1:
-                car.frozen = True
-                history.append(self._create_history_entry(
-                    car,
-                    status="collided",
-                    step=step,
-                    occupants=occupants
-                ))
+            car_ids = sorted(occupancy.occupants(key))
+            occupants = [cars[i] for i in car_ids]
+            for i, car in zip(car_ids, occupants):
+                if not car.frozen:
+                    collided.append((i, car, occupants))
+        return collided
+
+    def _log_collisions(
+        self,
+        collided: List[Tuple[int, Car, List[Car]]],
+        history: List[Dict[str, Any]],
+        step: int,
+        parked: Optional[Dict[int, int]] = None
+    ) -> None:
+        """
+        Part of run_all helper
+
+        Freeze the collided cars and log them in insertion order, catching up the
+        fast-forwarded ones first.
+        """
+        collided.sort(key=lambda item: item[0])
+        for i, car, occupants in collided:
+            if parked and i in parked:
+                self._unpark(car, step - parked[i], parked, i)
+            car.frozen = True
+            history.append(self._create_history_entry(
+                car,
+                status="collided",
+                step=step,
+                occupants=occupants
+            ))
 
     def _log_remaining_cars(
         self,
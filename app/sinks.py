@@ -0,0 +1,82 @@
+import csv
+import json
+from typing import Dict, Any, Iterable, TextIO
+
+CSV_COLUMNS = [
+    "name", "status", "x", "y", "direction",
+    "collision_step", "collision_x", "collision_y", "collision_with",
+]
+
+
+def flatten_event(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten a run_all entry into one CSV row, collision partners joined with ';'
+    """
+    row = {
+        "name": entry["name"],
+        "status": entry["status"],
+        "x": entry["final"]["x"],
+        "y": entry["final"]["y"],
+        "direction": entry["final"]["direction"],
+        "collision_step": "",
+        "collision_x": "",
+        "collision_y": "",
+        "collision_with": "",
+    }
+    collision = entry["collision"]
+    if collision is not None:
+        row["collision_step"] = collision["step"]
+        row["collision_x"] = collision["at"]["x"]
+        row["collision_y"] = collision["at"]["y"]
+        row["collision_with"] = ";".join(collision["with"])
+    return row
+
+
+class JsonlSink:
+    """
+    Writes events as JSON lines, flushing after each one so readers see them immediately
+    """
+
+    def __init__(self, stream: TextIO, flush: bool = True) -> None:
+        self.stream: TextIO = stream
+        self.flush: bool = flush
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(entry) + "\n")
+        if self.flush:
+            self.stream.flush()
+
+
+class CsvSink:
+    """
+    Writes events as CSV rows (see CSV_COLUMNS), header first
+    """
+
+    def __init__(self, stream: TextIO, flush: bool = True) -> None:
+        self.stream: TextIO = stream
+        self.flush: bool = flush
+        self._writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        self._writer.writerow(flatten_event(entry))
+        if self.flush:
+            self.stream.flush()
+
+
+def stream_events(events: Iterable[Dict[str, Any]], sink) -> int:
+    """
+    Push every event into the sink as it is produced.
+
+    Args:
+        events: Usually Simulation.iter_events().
+        sink: JsonlSink, CsvSink or any object with a write(entry) method.
+
+    Returns:
+        Number of events written.
+    """
+    count = 0
+    for entry in events:
+        sink.write(entry)
+        count += 1
+    return count
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks of the simulation: python -m benchmarks --help
+"""
+from benchmarks.generator import generate_scenario
+from benchmarks.runner import SUITE, compare, run_case, run_suite
+
+__all__ = ["generate_scenario", "SUITE", "compare", "run_case", "run_suite"]
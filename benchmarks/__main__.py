@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from benchmarks.runner import ENGINES, SUITE, compare, instrumentation_overhead, run_suite
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point: python -m benchmarks -o results.json --baseline baseline.json
+
+    Returns 1 when a tracked metric regressed against the baseline, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the simulation.")
+    parser.add_argument("--engine", choices=ENGINES, default="reference", help="Engine to benchmark")
+    parser.add_argument("--case", action="append", choices=list(SUITE), help="Case to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per case")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated scenarios")
+    parser.add_argument("--quick", action="store_true", help="Run every case with a tenth of the cars")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (default: 0.25)")
+    parser.add_argument("--overhead", action="store_true", help="Measure the cost of the instrumentation instead")
+    args = parser.parse_args(argv)
+
+    cases = {name: SUITE[name] for name in args.case} if args.case else SUITE
+    if args.overhead:
+        print(f"{'case':<15}{'bare s':>10}{'off s':>10}{'on s':>10}{'off':>8}{'on':>8}")
+        for name, params in cases.items():
+            params = dict(params, cars=max(1, params["cars"] // 10)) if args.quick else params
+            o = instrumentation_overhead(params, repeat=args.repeat, seed=args.seed)
+            print(f"{name:<15}{o['bare_s']:>10.4f}{o['off_s']:>10.4f}{o['on_s']:>10.4f}"
+                  f"{o['off_overhead']:>+8.1%}{o['on_overhead']:>+8.1%}")
+        return 0
+
+    report = run_suite(cases, engine=args.engine, repeat=args.repeat, seed=args.seed,
+                       scale=0.1 if args.quick else 1.0)
+
+    print(f"{'case':<15}{'setup s':>10}{'step s':>10}{'result s':>10}{'steps/s':>12}{'car-steps/s':>14}{'peak MiB':>10}")
+    for name, case in report["cases"].items():
+        m = case["metrics"]
+        print(f"{name:<15}{m['setup_s']:>10.4f}{m['step_s']:>10.4f}{m['results_s']:>10.4f}"
+              f"{m['steps_per_s']:>12.0f}{m['car_steps_per_s']:>14.0f}{m['peak_memory_bytes'] / 2 ** 20:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
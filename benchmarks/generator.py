@@ -0,0 +1,80 @@
+import math
+import random
+from typing import List, Optional, Set, Tuple
+
+from app.field import Field
+from app.scenario import CarRow
+
+
+def generate_scenario(
+    seed: int,
+    cars: int = 100,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    density: float = 0.05,
+    command_length: int = 50,
+    collision_rate: float = 0.0
+) -> Tuple[Field, List[CarRow]]:
+    """
+    Build a random scenario, identical for identical arguments.
+
+    Args:
+        seed: Seed of the random generator.
+        cars: Number of cars.
+        width, height: Field size. When omitted, a square field is sized so that
+            cars / area is close to density.
+        density: Share of the cells holding a car, used only to size the field.
+        command_length: Number of commands of every car.
+        collision_rate: Share of the cars placed in head-on pairs, two cells apart,
+            whose first command makes them collide at step 1. Pairs that do not fit
+            on the field are placed as ordinary cars.
+
+    Returns:
+        The field and (name, x, y, direction, commands) rows for Simulation.add_cars.
+
+    Raises:
+        ValueError if the cars do not fit on the field.
+    """
+    if width is None or height is None:
+        side = max(1, math.ceil(math.sqrt(cars / density)))
+        width, height = width or side, height or side
+    area = width * height
+    if cars > area:
+        raise ValueError(f"{cars} cars do not fit on a {width}x{height} field.")
+
+    rng = random.Random(seed)
+    taken: Set[Tuple[int, int]] = set()
+    rows: List[CarRow] = []
+
+    def program(first: str = "") -> str:
+        return first + "".join(rng.choices("FFFLR", k=command_length - len(first)))
+
+    pairs = int(cars * collision_rate) // 2 if command_length and width >= 3 else 0
+    for _ in range(pairs):
+        for _ in range(100):
+            x, y = rng.randrange(width - 2), rng.randrange(height)
+            cells = [(x, y), (x + 1, y), (x + 2, y)]
+            if not taken.intersection(cells) and area - len(taken) - 3 >= cars - len(rows) - 2:
+                break
+        else:
+            break
+        taken.update(cells)
+        rows.append((f"C{len(rows)}", x, y, "E", program("F")))
+        rows.append((f"C{len(rows)}", x + 2, y, "W", program("F")))
+
+    # Rejection sampling is cheap on sparse fields, shuffling the free cells on dense ones
+    remaining = cars - len(rows)
+    if remaining > (area - len(taken)) // 2:
+        free = [(x, y) for y in range(height) for x in range(width) if (x, y) not in taken]
+        cells = rng.sample(free, remaining)
+    else:
+        cells = []
+        while len(cells) < remaining:
+            cell = (rng.randrange(width), rng.randrange(height))
+            if cell not in taken:
+                taken.add(cell)
+                cells.append(cell)
+
+    for x, y in cells:
+        rows.append((f"C{len(rows)}", x, y, rng.choice("NESW"), program()))
+    return Field(width, height), rows
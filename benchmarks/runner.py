@@ -0,0 +1,214 @@
+import json
+import platform
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable, Optional
+
+from app.cli import format_result
+from app.simulation import Simulation
+from benchmarks.generator import generate_scenario
+
+# Named scenarios run by default: generate_scenario arguments, the seed excepted
+SUITE: Dict[str, Dict[str, Any]] = {
+    "sparse": {"cars": 1000, "density": 0.01, "command_length": 200},
+    "dense": {"cars": 1000, "density": 0.5, "command_length": 200},
+    "collisions": {"cars": 1000, "density": 0.05, "command_length": 200, "collision_rate": 0.5},
+    "long-programs": {"cars": 50, "density": 0.05, "command_length": 10000},
+    "many-cars": {"cars": 20000, "density": 0.05, "command_length": 20},
+    "open-field": {"cars": 200, "width": 2000, "height": 2000, "command_length": 2000},
+}
+
+# Metrics checked by compare: name -> True if higher is better
+TRACKED_METRICS: Dict[str, bool] = {
+    "setup_s": False,
+    "results_s": False,
+    "steps_per_s": True,
+    "car_steps_per_s": True,
+    "peak_memory_bytes": False,
+}
+
+
+def _engine(name: str) -> Callable[[Simulation], List[Dict[str, Any]]]:
+    """
+    Function running a simulation with the named engine and returning its history.
+    """
+    if name == "reference":
+        return Simulation.run_all
+    if name == "trajectory":
+        from app.trajectory import TrajectoryEngine
+        return lambda sim: TrajectoryEngine(sim).run()
+    if name == "vectorized":
+        from app.vectorized import VectorizedEngine
+        return lambda sim: VectorizedEngine(sim).run()
+    raise ValueError(f"Unknown engine '{name}'.")
+
+
+ENGINES = ["reference", "trajectory", "vectorized"]
+
+
+def _run_once(rows, field, run) -> Dict[str, Any]:
+    """
+    Time one full pass: setup (add_cars), stepping (the engine) and result building
+    (the CLI report lines and the JSON output).
+    """
+    started = time.perf_counter()
+    sim = Simulation(field)
+    sim.add_cars(rows)
+    loaded = time.perf_counter()
+    history = run(sim)
+    stepped = time.perf_counter()
+    [format_result(entry) for entry in history]
+    json.dumps(history)
+    finished = time.perf_counter()
+
+    # A fresh car executes one command per step until it stops, so the run lasts as
+    # long as the longest stretch of executed commands.
+    executed = [car.command_index for car in sim.cars.values()]
+    return {
+        "setup_s": loaded - started,
+        "step_s": stepped - loaded,
+        "results_s": finished - stepped,
+        "steps": max(executed, default=0),
+        "car_steps": sum(executed),
+        "collisions": sum(entry["status"] == "collided" for entry in history),
+    }
+
+
+def run_case(params: Dict[str, Any], engine: str = "reference", repeat: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """
+    Benchmark one scenario.
+
+    Each phase keeps its best time over `repeat` passes. Peak memory is measured by
+    one more pass under tracemalloc, which is kept out of the timed passes as it slows
+    down every allocation.
+
+    Returns:
+        Phase timings (seconds), steps and car-steps with their rates, number of
+        collisions and peak traced memory (bytes).
+    """
+    field, rows = generate_scenario(seed, **params)
+    run = _engine(engine)
+
+    passes = [_run_once(rows, field, run) for _ in range(max(1, repeat))]
+    metrics = {key: min(p[key] for p in passes) for key in ("setup_s", "step_s", "results_s")}
+    for key in ("steps", "car_steps", "collisions"):
+        metrics[key] = passes[0][key]
+    step_s = metrics["step_s"] or float("nan")
+    metrics["steps_per_s"] = metrics["steps"] / step_s
+    metrics["car_steps_per_s"] = metrics["car_steps"] / step_s
+
+    tracemalloc.start()
+    try:
+        _run_once(rows, field, run)
+        metrics["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return metrics
+
+
+def run_suite(
+    cases: Optional[Dict[str, Dict[str, Any]]] = None,
+    engine: str = "reference",
+    repeat: int = 3,
+    seed: int = 0,
+    scale: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Benchmark every case and gather the results in a JSON-ready report.
+
+    Args:
+        cases: Case name -> generate_scenario arguments, the SUITE by default.
+        engine: One of ENGINES.
+        repeat: Timed passes per case.
+        seed: Seed of every generated scenario.
+        scale: Factor applied to the car count of every case, for quick runs.
+    """
+    cases = SUITE if cases is None else cases
+    report: Dict[str, Any] = {
+        "engine": engine,
+        "seed": seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {},
+    }
+    for name, params in cases.items():
+        params = dict(params, cars=max(1, int(params["cars"] * scale)))
+        report["cases"][name] = {
+            "params": params,
+            "metrics": run_case(params, engine=engine, repeat=repeat, seed=seed),
+        }
+    return report
+
+
+def _bare_run(sim: Simulation) -> None:
+    """
+    A copy of the step loop of Simulation.run_all on its default path (fast_forward
+    off, no recorder), with no instrumentation branch at all, as a reference for
+    the cost of the instrumentation switch.
+    """
+    history: List[Dict[str, Any]] = []
+    cars = list(sim.cars.values())
+    occupancy = sim._build_occupancy(cars)
+    movers = sim._movable_cars(cars, range(len(cars)))
+    step = 0
+    while movers:
+        step += 1
+        entered = sim._move_all_cars(cars, movers, occupancy)
+        sim._detect_collisions(cars, entered, occupancy, history, step)
+        movers = sim._movable_cars(cars, movers)
+    sim._reindex()
+    sim._log_remaining_cars(cars, history)
+
+
+def instrumentation_overhead(params: Dict[str, Any], repeat: int = 3, seed: int = 0) -> Dict[str, float]:
+    """
+    Best stepping time of one scenario run by the bare step loop, by run_all with
+    instrumentation off, and by run_all with instrumentation on.
+
+    Returns:
+        {"bare_s", "off_s", "on_s", "off_overhead", "on_overhead"}, overheads relative to bare_s.
+    """
+    field, rows = generate_scenario(seed, **params)
+
+    def best(run: Callable[[Simulation], Any], instrument: bool = False) -> float:
+        times = []
+        for _ in range(max(1, repeat)):
+            sim = Simulation(field)
+            sim.add_cars(rows)
+            if instrument:
+                sim.instrument()
+            started = time.perf_counter()
+            run(sim)
+            times.append(time.perf_counter() - started)
+        return min(times)
+
+    bare = best(_bare_run)
+    off = best(Simulation.run_all)
+    on = best(Simulation.run_all, instrument=True)
+    return {"bare_s": bare, "off_s": off, "on_s": on, "off_overhead": off / bare - 1, "on_overhead": on / bare - 1}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.25) -> List[str]:
+    """
+    Flag the tracked metrics of current that are worse than baseline by more than tolerance.
+
+    Only cases present in both reports, run with the same engine and parameters, are compared.
+
+    Returns:
+        One message per regression, empty if there is none.
+    """
+    regressions = []
+    if baseline.get("engine") != current["engine"]:
+        return regressions
+    for name, case in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None or base["params"] != case["params"]:
+            continue
+        for metric, higher_is_better in TRACKED_METRICS.items():
+            old, new = base["metrics"].get(metric), case["metrics"].get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{name}: {metric} {old:.4g} -> {new:.4g} ({change:+.0%})")
+    return regressions
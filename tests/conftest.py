@@ -1,3 +1,5 @@
+import random
+
 import pytest
 from app.field import Field
 from app.car import Car
@@ -14,3 +16,24 @@ def car(field):
 @pytest.fixture
 def simulation(field):
     return Simulation(field)
+
+
+def build_random_simulation(seed, width=12, height=12, car_count=20, max_commands=30, obstacle_rate=0.0):
+    """Deterministically populate a simulation with random cars (and obstacles) for engine cross-checks."""
+    rng = random.Random(seed)
+    sim = Simulation(Field(width, height))
+    all_cells = [(x, y) for x in range(width) for y in range(height)]
+    cells = rng.sample(all_cells, car_count)
+    if obstacle_rate:
+        free = sorted(set(all_cells) - set(cells))
+        for x, y in rng.sample(free, int(len(free) * obstacle_rate)):
+            sim.field.add_obstacle(x, y)
+    for i, (x, y) in enumerate(cells):
+        commands = "".join(rng.choice("FFFLR") for _ in range(rng.randint(0, max_commands)))
+        sim.add_car(f"C{i}", x, y, rng.choice("NESW"), commands)
+    return sim
+
+
+@pytest.fixture
+def random_simulation():
+    return build_random_simulation
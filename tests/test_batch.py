@@ -0,0 +1,61 @@
+import io
+import json
+
+from app.batch import run_batch, run_scenario, main
+
+
+def _scenario(scenario_id, *cars):
+    return {"id": scenario_id, "field": [10, 10], "cars": [
+        {"name": name, "x": x, "y": y, "direction": d, "commands": c} for name, x, y, d, c in cars
+    ]}
+
+
+COLLISION = _scenario("collision", ("A", 1, 2, "N", "FFRFFFFRRL"), ("B", 7, 8, "W", "FFLFFFFFFF"))
+SINGLE = _scenario("single", ("A", 1, 2, "N", "FFRFFFFRRL"))
+
+
+def test_run_scenario_reuses_simulation():
+    """A scenario should produce the run_all history plus timings."""
+    result = run_scenario(COLLISION)
+    assert result["id"] == "collision"
+    assert [r["status"] for r in result["results"]] == ["collided", "collided"]
+    assert result["errors"] == []
+    assert set(result["timings"]) == {"setup", "run"}
+
+
+def test_run_scenario_reports_rejected_cars():
+    """Cars that cannot be placed should be reported per row."""
+    result = run_scenario(_scenario("bad", ("A", 1, 1, "N", "F"), ("B", 1, 1, "N", "F")))
+    assert result["errors"] == [{"row": 1, "error": "Position (1, 1) is already occupied by another car."}]
+    assert [r["name"] for r in result["results"]] == ["A"]
+
+
+def test_run_batch_keeps_input_order():
+    """Ordered output should follow the input, including invalid lines."""
+    lines = [json.dumps(SINGLE), "not json", "", json.dumps(COLLISION)] * 3
+    out = io.StringIO()
+    count = run_batch(lines, out, workers=2, chunksize=2)
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert count == 9
+    assert [r["index"] for r in results] == [0, 1, 3, 4, 5, 7, 8, 9, 11]
+    assert results[0]["results"][0]["final"] == {"x": 5, "y": 4, "direction": "S"}
+    assert "Invalid scenario" in results[1]["error"]
+
+
+def test_run_batch_unordered_returns_everything():
+    """Completion order may differ, but every scenario should come back once."""
+    lines = [json.dumps(_scenario(str(i), ("A", i % 10, 0, "N", "F" * i))) for i in range(20)]
+    out = io.StringIO()
+    run_batch(lines, out, workers=2, chunksize=3, ordered=False)
+    indices = sorted(json.loads(line)["index"] for line in out.getvalue().splitlines())
+    assert indices == list(range(20))
+
+
+def test_main_reads_and_writes_files(tmp_path):
+    """The command-line entry point should stream a JSONL file into another."""
+    source = tmp_path / "in.jsonl"
+    target = tmp_path / "out.jsonl"
+    source.write_text(json.dumps(SINGLE) + "\n" + json.dumps(COLLISION) + "\n")
+    main([str(source), "-o", str(target), "--workers", "1"])
+    assert [json.loads(line)["id"] for line in target.read_text().splitlines()] == ["single", "collision"]
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app.simulation import Simulation
+from benchmarks import compare, generate_scenario, run_case, run_suite
+from benchmarks.__main__ import main
+
+
+def test_generator_is_deterministic():
+    """The same seed and arguments should give the same scenario."""
+    assert generate_scenario(3, cars=50)[1] == generate_scenario(3, cars=50)[1]
+    assert generate_scenario(3, cars=50)[1] != generate_scenario(4, cars=50)[1]
+
+
+def test_generator_respects_its_arguments():
+    field, rows = generate_scenario(0, cars=40, density=0.1, command_length=7)
+    assert field.width * field.height >= 400
+    assert len(rows) == 40
+    assert all(len(commands) == 7 for *_, commands in rows)
+
+    sim = Simulation(field)
+    assert sim.add_cars(rows) == []
+
+
+def test_generator_fills_a_field_completely():
+    field, rows = generate_scenario(1, cars=12, width=4, height=3)
+    assert len({(x, y) for _, x, y, _, _ in rows}) == 12
+    with pytest.raises(ValueError):
+        generate_scenario(1, cars=13, width=4, height=3)
+
+
+def test_collision_rate_creates_collisions():
+    """Head-on pairs should collide at the first step."""
+    field, rows = generate_scenario(2, cars=100, density=0.01, command_length=10, collision_rate=0.4)
+    sim = Simulation(field)
+    sim.add_cars(rows)
+    first_step = [e for e in sim.run_all() if e["status"] == "collided" and e["collision"]["step"] == 1]
+    assert len(first_step) >= 40
+
+
+def test_run_case_reports_metrics():
+    metrics = run_case({"cars": 20, "command_length": 15}, repeat=1)
+    assert metrics["steps"] == 15
+    assert metrics["car_steps"] <= 20 * 15
+    assert metrics["steps_per_s"] > 0
+    assert metrics["peak_memory_bytes"] > 0
+    assert set(metrics) >= {"setup_s", "step_s", "results_s", "car_steps_per_s", "collisions"}
+
+
+def test_compare_flags_regressions():
+    params = {"cars": 10}
+    baseline = {"engine": "reference", "cases": {"a": {"params": params, "metrics": {
+        "steps_per_s": 1000.0, "setup_s": 1.0, "peak_memory_bytes": 100}}}}
+    current = {"engine": "reference", "cases": {"a": {"params": params, "metrics": {
+        "steps_per_s": 500.0, "setup_s": 1.1, "peak_memory_bytes": 200}}}}
+
+    regressions = compare(baseline, current, tolerance=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("a: steps_per_s")
+    assert compare(baseline, current, tolerance=1.5) == []
+    assert compare(baseline, dict(current, engine="trajectory")) == []
+
+
+def test_main_writes_results_and_checks_baseline(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    args = ["--case", "dense", "--quick", "--repeat", "1", "-o", str(output)]
+    assert main(args) == 0
+    report = json.loads(output.read_text())
+    assert set(report["cases"]) == {"dense"}
+
+    report["cases"]["dense"]["metrics"]["steps_per_s"] *= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    assert main(args + ["--baseline", str(baseline)]) == 1
+    assert "REGRESSION dense: steps_per_s" in capsys.readouterr().out
+
+
+def test_run_suite_scales_car_counts():
+    report = run_suite({"tiny": {"cars": 30, "command_length": 5}}, repeat=1, scale=0.5)
+    assert report["cases"]["tiny"]["params"]["cars"] == 15
+
+
+def test_instrumentation_overhead_reports_all_modes():
+    from benchmarks.runner import instrumentation_overhead
+
+    overhead = instrumentation_overhead({"cars": 20, "command_length": 10}, repeat=1)
+    assert set(overhead) == {"bare_s", "off_s", "on_s", "off_overhead", "on_overhead"}
+    assert overhead["bare_s"] > 0
@@ -1,5 +1,10 @@
+import tracemalloc
+from unittest.mock import patch
+
 import pytest
 from app.car import Car
+from app.field import Field
+from app.program import _compile
 
 
 def test_initial_position(car):
@@ -26,6 +31,28 @@ def test_invalid_command_ignored(car):
     assert car.posture() == (1, 2, "N"), "Invalid command changed posture"
 
 
+def test_unknown_letters_are_skipped_by_execute_next(car):
+    """Unknown letters, ASCII or not, should use up a step without moving or turning the car."""
+    car.set_commands("XRxLLzF")
+    for _ in range(4):
+        car.execute_next()
+    assert car.posture() == (1, 2, "N") and car.command_index == 4
+    while car.has_remaining_commands():
+        car.execute_next()
+    assert car.posture() == (0, 2, "W")
+    car.execute("é")
+    assert car.posture() == (0, 2, "W")
+
+    car.set_commands("Fé\u4e2dF")
+    while car.has_remaining_commands():
+        car.execute_next()
+    assert car.posture() == (0, 2, "W") and car.command_index == 4
+    car.set_commands("RFéF")
+    while car.has_remaining_commands():
+        car.execute_next()
+    assert car.posture() == (0, 4, "N") and car.command_index == 4
+
+
 def test_forward_move_within_bounds(car):
     """Car should move one step north when facing North and not at boundary."""
     car.execute("F")
@@ -48,3 +75,50 @@ def test_set_command_updates_car_commands(car):
     car.set_commands("LRFF")
     assert car.commands == "LRFF", "Expected command list to be updated to ['L', 'R', 'F', 'F']"
     assert car.command_index == 0, "Index not reset"
+
+
+def test_direction_is_stored_as_heading(car):
+    """The heading should be an int while direction stays a letter."""
+    car.execute("R")
+    assert car.heading == 1
+    assert car.direction == "E"
+    car.direction = "W"
+    assert car.posture() == (1, 2, "W")
+
+
+def test_car_memory_footprint(field):
+    """
+    Cars should carry no __dict__ and store commands as bytes.
+    A dict-based car holding its commands as str took about 215 bytes here.
+    Each car gets its own program, with the cache of short programs patched out: that
+    is bounded bookkeeping shared by all cars, not storage of their own.
+    """
+    count = 10_000
+    names = [f"C{i}" for i in range(count)]
+    coordinates = list(range(count))
+    programs = ["FFLRF" + format(i, "014b").replace("0", "F").replace("1", "R") for i in range(count)]
+    cars = [None] * count
+
+    with patch("app.program._compile_interned", _compile):
+        tracemalloc.start()
+        try:
+            for i in range(count):
+                car = Car(names[i], coordinates[i], coordinates[i], "N", field)
+                car.set_commands(programs[i])
+                cars[i] = car
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert not hasattr(cars[0], "__dict__")
+    assert current / count < 160
+
+
+def test_obstacles_stop_forward_moves():
+    """A forward move into an obstacle is ignored, like one off the field."""
+    field = Field(5, 5, [(0, 2)])
+    car = Car("A", 0, 0, "N", field)
+    car.set_commands("FFFRF")
+    while car.has_remaining_commands():
+        car.execute_next()
+    assert car.posture() == (1, 1, "E")
@@ -0,0 +1,96 @@
+import pickle
+
+import pytest
+
+from app.checkpoint import load_checkpoint, save_checkpoint
+from app.field import Field
+from app.simulation import Simulation
+
+
+def test_round_trip_before_run(tmp_path, simulation):
+    """A checkpoint of a fresh simulation should restore the same cars."""
+    simulation.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    simulation.add_car("Bé", 7, 8, "W", "")
+    path = tmp_path / "sim.ckpt"
+    save_checkpoint(simulation, str(path))
+
+    restored = load_checkpoint(str(path))
+    assert (restored.field.width, restored.field.height) == (10, 10)
+    assert restored.list_cars() == simulation.list_cars()
+    assert restored.is_occupied(7, 8)
+    assert restored.step_count == 0 and restored.collisions == []
+
+
+def test_resume_matches_uninterrupted_run(tmp_path, random_simulation):
+    """Stopping after a checkpoint and resuming should give the uninterrupted result."""
+    expected = random_simulation(7, width=8, height=8, car_count=25).run_all()
+    assert any(r["status"] == "collided" for r in expected)
+
+    path = tmp_path / "sim.ckpt"
+    interrupted = random_simulation(7, width=8, height=8, car_count=25)
+    events = interrupted.iter_events(checkpoint_every=5, checkpoint_path=str(path))
+    while interrupted.step_count < 12:
+        next(events)
+    events.close()  # the process "dies" here, some steps after the last checkpoint
+
+    resumed = load_checkpoint(str(path))
+    assert resumed.step_count == interrupted.step_count // 5 * 5 >= 10
+    assert resumed.run_all() == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_on_demand_checkpoint_between_events(tmp_path, seed, random_simulation):
+    """A checkpoint taken at any yield point should resume to the same result."""
+    expected = random_simulation(seed, width=6, height=6, car_count=15).run_all()
+
+    sim = random_simulation(seed, width=6, height=6, car_count=15)
+    events = sim.iter_events()
+    for _ in range(2):
+        next(events, None)
+    path = tmp_path / "sim.ckpt"
+    save_checkpoint(sim, str(path))
+
+    assert load_checkpoint(str(path)).run_all() == expected
+
+
+def test_restored_cars_can_be_pickled(tmp_path, simulation):
+    """Cars running off the memory map should still cross process boundaries."""
+    simulation.add_car("A", 1, 2, "N", "FFR")
+    path = tmp_path / "sim.ckpt"
+    save_checkpoint(simulation, str(path))
+    car = load_checkpoint(str(path)).cars["A"]
+
+    clone = pickle.loads(pickle.dumps(car))
+    assert clone.commands == "FFR"
+    assert clone.posture() == (1, 2, "N")
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"not a checkpoint at all, definitely not" * 2)
+    with pytest.raises(ValueError, match="not a simulation checkpoint"):
+        load_checkpoint(str(path))
+
+
+def test_compressed_programs_survive_checkpoint(tmp_path, simulation):
+    """Compressed programs should be restored as programs, not as plain text."""
+    simulation.add_car("A", 0, 0, "E", "F3(LR)*2")
+    events = simulation.iter_events(checkpoint_every=2, checkpoint_path=str(tmp_path / "sim.ckpt"))
+    assert list(events)[0]["final"] == {"x": 3, "y": 0, "direction": "E"}
+
+    restored = load_checkpoint(str(tmp_path / "sim.ckpt"))
+    assert restored.cars["A"].commands == "F3(LR)*2"
+    assert restored.cars["A"].command_index == 6
+
+
+def test_obstacles_survive_checkpoint(tmp_path):
+    """The obstacle bitmap should be saved and read back from the mapping."""
+    sim = Simulation(Field(20, 3, [(10, 0), (3, 2)]))
+    sim.add_car("A", 0, 0, "E", "F30")
+    path = str(tmp_path / "sim.ckpt")
+    save_checkpoint(sim, path)
+
+    restored = load_checkpoint(path)
+    assert restored.field.obstacle_count() == 2 and restored.field.is_blocked(3, 2)
+    assert restored.run_all()[0]["final"] == {"x": 9, "y": 0, "direction": "E"}
+    assert pickle.loads(pickle.dumps(restored.field)).is_blocked(10, 0)
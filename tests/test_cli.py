@@ -1,6 +1,10 @@
+import io
+import json
+
 import pytest
 from unittest.mock import patch
 from app.cli import SimulationCLI
+from app.main import start_simulation
 
 
 def test_single_car_simulation(capsys):
@@ -145,3 +149,69 @@ def test_cli_restart_after_simulation(capsys):
     assert "- A, (1,2) N, F" in out
     assert "- B, (0,0) E, F" in out
     assert "Thank you for running the simulation. Goodbye!" in out
+
+
+SCENARIO = "10 10\nA 1 2 N FFRFFFFRRL\nB 7 8 W FFLFFFFFFF\nC 0 0 N F\n"
+
+
+def test_entry_point_exists():
+    """The console script declared in pyproject.toml should resolve."""
+    from app.main import start_simulation
+    assert callable(start_simulation)
+
+
+def test_scenario_file_mode(tmp_path, capsys):
+    """--scenario should run the whole file without prompting and print results once."""
+    path = tmp_path / "scenario.txt"
+    path.write_text(SCENARIO)
+    with patch("builtins.input", side_effect=AssertionError("no prompt expected")):
+        assert start_simulation(["--scenario", str(path)]) == 0
+
+    out = capsys.readouterr().out
+    assert out.count("After simulation, the result is:") == 1
+    assert "- A, collides with B at (5,4) at step 7" in out
+    assert "- C, (0,1) N" in out
+    assert "Your current list of cars are:" not in out
+
+
+def test_stdin_quiet_mode(capsys):
+    """--stdin --quiet should print the result lines only."""
+    with patch("sys.stdin", io.StringIO(SCENARIO)):
+        assert start_simulation(["--stdin", "--quiet"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == ["- A, collides with B at (5,4) at step 7",
+                     "- B, collides with A at (5,4) at step 7",
+                     "- C, (0,1) N"]
+
+
+def test_json_output_and_rejected_cars(tmp_path, capsys):
+    """JSON output should carry the run_all entries and the rejected cars."""
+    path = tmp_path / "scenario.txt"
+    path.write_text("5 5\nA 1 1 N F\nB 1 1 E F\nC 1 1 Q F\n")
+    assert start_simulation(["--scenario", str(path), "--format", "json"]) == 1
+
+    payload = json.loads(capsys.readouterr().out)
+    assert [r["name"] for r in payload["results"]] == ["A"]
+    assert payload["errors"] == ["Line 4: Invalid direction.",
+                                 "Car B: Position (1, 1) is already occupied by another car."]
+
+
+def test_missing_scenario_file(tmp_path, capsys):
+    assert start_simulation(["--scenario", str(tmp_path / "missing.txt")]) == 1
+    assert "Cannot read scenario" in capsys.readouterr().out
+
+
+def test_profile_writes_pstats_and_counters(tmp_path, capsys):
+    """--profile should write loadable pstats output and report the counters on stderr."""
+    import pstats
+
+    path = tmp_path / "scenario.txt"
+    path.write_text(SCENARIO)
+    profile = tmp_path / "run.prof"
+    assert start_simulation(["--scenario", str(path), "--quiet", "--profile", str(profile)]) == 0
+
+    captured = capsys.readouterr()
+    assert "- C, (0,1) N" in captured.out
+    assert "collisions" in captured.err and "moves" not in captured.out
+    stats = pstats.Stats(str(profile))
+    assert any(function == "run_all" for _, _, function in stats.stats)
@@ -23,3 +23,58 @@ def test_field_with_zero_size_disallows_all_positions():
     """
     field = Field(0, 0)
     assert not field.is_within_bounds(0, 0), "Zero-sized field should disallow all coordinates"
+
+
+def test_obstacles_block_cells():
+    field = Field(10, 10, [(3, 4), (0, 0)])
+    assert field.has_obstacles and field.obstacle_count() == 2
+    assert field.is_blocked(3, 4) and not field.is_blocked(4, 3)
+    assert not field.is_passable(3, 4)
+    assert not field.is_passable(10, 0)
+    assert field.is_passable(9, 9)
+    with pytest.raises(ValueError, match="outside the field bounds"):
+        field.add_obstacle(10, 0)
+
+
+def test_field_without_obstacles_has_no_bitmap():
+    field = Field(1000, 1000)
+    assert field.obstacles is None and field.obstacle_count() == 0
+    assert field.is_passable(999, 999) and not field.is_blocked(5, 5)
+
+
+def test_map_file_reads_top_row_first(tmp_path):
+    path = tmp_path / "map.txt"
+    path.write_text("#..\n.#.\n..#\n\n")
+    field = Field.from_file(str(path))
+    assert (field.width, field.height) == (3, 3)
+    assert [(x, y) for y in range(3) for x in range(3) if field.is_blocked(x, y)] == [(2, 0), (1, 1), (0, 2)]
+
+    path.write_text("#..\n.#\n")
+    with pytest.raises(ValueError, match="same length"):
+        Field.from_file(str(path))
+
+
+def test_grid_and_bitmap_constructors():
+    grid = [[False, True, False, False, False, False, False, False, False],
+            [True, False, False, False, False, False, False, False, True]]
+    field = Field.from_grid(grid)
+    assert (field.width, field.height) == (9, 2)
+    assert [(x, y) for y in range(2) for x in range(9) if field.is_blocked(x, y)] == [(1, 0), (0, 1), (8, 1)]
+
+    copy = Field.from_bitmap(9, 2, bytes(field.obstacles))
+    assert copy.obstacle_count() == 3 and copy.is_blocked(8, 1)
+    with pytest.raises(ValueError, match="too short"):
+        Field.from_bitmap(9, 2, b"\0")
+
+
+def test_numpy_grid_and_batch_checks():
+    np = pytest.importorskip("numpy")
+    grid = np.zeros((4, 5), dtype=bool)
+    grid[2, 3] = grid[0, 0] = True
+    field = Field.from_grid(grid)
+    assert field.is_blocked(3, 2) and field.is_blocked(0, 0) and field.obstacle_count() == 2
+
+    xs = np.array([3, 0, 1, -1, 4, 5])
+    ys = np.array([2, 0, 1, 0, 3, 0])
+    assert field.passable_mask(xs, ys).tolist() == [False, False, True, False, True, False]
+    assert Field(5, 4).passable_mask(xs, ys).tolist() == [True, True, True, False, True, False]
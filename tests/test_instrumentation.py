@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+from app.field import Field
+from app.simulation import Simulation
+
+
+def test_counters_of_a_small_run():
+    """Every command should be counted once, by what it did."""
+    sim = Simulation(Field(5, 5))
+    sim.add_car("A", 0, 0, "S", "FLFF")   # blocked, turn, two moves east
+    sim.add_car("B", 2, 1, "S", "F")      # moves into (2,0), then parks there
+    sim.fast_forward = False
+    stats = sim.instrument()
+    results = sim.run_all()
+
+    assert results[0]["collision"] == {"with": ["B"], "at": {"x": 2, "y": 0}, "step": 4}
+    assert stats.counters == {
+        "steps": 4, "moves": 3, "blocked": 1, "turns": 1, "skipped": 0, "cells_checked": 3, "collisions": 2
+    }
+    assert all(seconds >= 0 for seconds in stats.timers.values())
+    assert stats.timers["move"] > 0
+
+
+def test_counters_of_a_fast_forwarded_run():
+    """Commands that cannot move a car should be skipped, and the steps nobody moves in jumped over."""
+    sim = Simulation(Field(5, 5))
+    sim.add_car("A", 0, 0, "S", "F" * 8 + "LFF")   # parked after its first blocked forward
+    sim.add_car("B", 2, 1, "S", "F")
+    sim.fast_forward = True
+    stats = sim.instrument()
+    results = sim.run_all()
+
+    assert results[0]["collision"] == {"with": ["B"], "at": {"x": 2, "y": 0}, "step": 11}
+    assert stats.counters == {
+        "steps": 3, "moves": 3, "blocked": 1, "turns": 0, "skipped": 8, "cells_checked": 3, "collisions": 2
+    }
+
+
+def test_step_callbacks():
+    sim = Simulation(Field(5, 5))
+    sim.add_car("A", 0, 0, "N", "FFR")
+    stats = sim.instrument()
+    seen = []
+
+    @stats.on_step
+    def record(step, instrumentation):
+        seen.append((step, instrumentation.counters["moves"]))
+
+    sim.run_all()
+    assert seen == [(1, 1), (2, 2), (3, 2)]
+
+
+def test_instrumented_runs_match_plain_runs(random_simulation):
+    for seed in range(20):
+        plain = random_simulation(seed)
+        instrumented = random_simulation(seed)
+        stats = instrumented.instrument()
+        assert instrumented.run_all() == plain.run_all()
+        assert instrumented.list_cars() == plain.list_cars()
+        last_step = max((c.command_index for c in plain.cars.values()), default=0)
+        assert stats.counters["steps"] + stats.counters["skipped"] >= last_step >= stats.counters["steps"]
+
+
+def test_instrumentation_is_off_by_default(random_simulation):
+    """Without instrumentation the plain step loop should run."""
+    sim = random_simulation(1)
+    assert sim.instrumentation is None
+    with patch.object(Simulation, "_instrumented_step", side_effect=AssertionError("instrumented")):
+        sim.run_all()
+
+
+def test_reset_and_report():
+    sim = Simulation(Field(3, 3))
+    sim.add_car("A", 0, 0, "N", "F")
+    stats = sim.instrument()
+    sim.run_all()
+    assert stats.report()["counters"]["moves"] == 1
+    assert "moves" in stats.summary()
+
+    stats.reset()
+    assert stats.report()["counters"]["moves"] == 0
+    assert sim.instrument() is stats
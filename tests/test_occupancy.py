@@ -0,0 +1,60 @@
+import pytest
+
+from app.field import Field
+from app.occupancy import DenseOccupancy, Occupancy, SparseOccupancy, choose_occupancy
+from app.simulation import Simulation
+
+
+@pytest.mark.parametrize("backend", [lambda: DenseOccupancy(10, 10), lambda: SparseOccupancy(10)])
+def test_backends_share_behaviour(backend):
+    """Both backends should track single and stacked occupants the same way."""
+    occupancy = backend()
+    key = occupancy.key(3, 4)
+    assert key == 43
+    assert occupancy.occupants(key) == []
+
+    occupancy.add(key, 0)
+    assert occupancy.occupants(key) == [0]
+    assert not occupancy.is_shared(key)
+
+    occupancy.add(key, 5)
+    occupancy.add(key, 2)
+    assert sorted(occupancy.occupants(key)) == [0, 2, 5]
+    assert occupancy.is_shared(key)
+
+    occupancy.remove(key, 0)
+    occupancy.remove(key, 5)
+    assert occupancy.occupants(key) == [2]
+    assert not occupancy.is_shared(key)
+
+    occupancy.remove(key, 2)
+    assert occupancy.occupants(key) == []
+
+
+def test_dense_backend_uses_four_bytes_per_cell():
+    assert DenseOccupancy(1000, 1000)._cells.itemsize == 4
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        Occupancy(10)
+
+
+@pytest.mark.parametrize("width,height,cars,expected", [
+    (10, 10, 1, DenseOccupancy),                # small field
+    (4000, 4000, 1_000_000, DenseOccupancy),    # large but crowded
+    (4000, 4000, 10, SparseOccupancy),          # large and sparse
+    (10 ** 9, 10 ** 9, 10 ** 6, SparseOccupancy),
+])
+def test_backend_choice(width, height, cars, expected):
+    """The backend should follow field area and car density."""
+    assert isinstance(choose_occupancy(Field(width, height), cars), expected)
+
+
+def test_huge_sparse_field_collision():
+    """Collisions on a 10^9 x 10^9 field should go through the sparse backend."""
+    sim = Simulation(Field(10 ** 9, 10 ** 9))
+    sim.add_car("A", 10 ** 9 - 2, 10 ** 9 - 1, "E", "F")
+    sim.add_car("B", 10 ** 9 - 1, 10 ** 9 - 2, "N", "F")
+    result = sim.run_all()
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 10 ** 9 - 1, "y": 10 ** 9 - 1}, "step": 1}
@@ -0,0 +1,56 @@
+import pytest
+
+from app.field import Field
+from app.parallel import Tile, TiledSimulation
+from app.simulation import Simulation
+
+
+def test_tile_of_splits_field_evenly():
+    """Cells should be owned by the tile covering them."""
+    tiled = TiledSimulation(Simulation(Field(10, 6)), columns=3, rows=2)
+    assert tiled.x_edges == [0, 3, 6]
+    assert tiled.y_edges == [0, 3]
+    assert tiled.tile_of(0, 0) == 0
+    assert tiled.tile_of(9, 0) == 2
+    assert tiled.tile_of(3, 5) == 4
+
+
+def test_tile_hands_over_leaving_cars(field):
+    """A car moving past the tile edge should leave the tile."""
+    sim = Simulation(field)
+    sim.add_car("A", 4, 0, "E", "F")
+    tile = Tile(0, 0, 5, 10, [(0, sim.cars["A"])], sim.field)
+    leaving = tile.move()
+    assert [(car_id, car.position()) for car_id, car in leaving] == [(0, (5, 0))]
+    assert tile.cars == {}
+
+
+def test_collision_on_tile_edge():
+    """Cars meeting on the first cell of a neighbouring tile should collide there."""
+    sim = Simulation(Field(10, 10))
+    sim.add_car("A", 3, 5, "E", "FF")
+    sim.add_car("B", 6, 5, "W", "F")
+    result = TiledSimulation(sim, columns=2).run()
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 5, "y": 5}, "step": 2}
+    assert result[1]["collision"] == {"with": ["A"], "at": {"x": 5, "y": 5}, "step": 2}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_run_all_on_random_fleets(seed, random_simulation):
+    """History and final car state should be identical to run_all."""
+    reference = random_simulation(seed, width=9, height=9, car_count=30)
+    candidate = random_simulation(seed, width=9, height=9, car_count=30)
+
+    assert TiledSimulation(candidate, columns=3, rows=2).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+    assert [c.frozen for c in candidate.cars.values()] == [c.frozen for c in reference.cars.values()]
+
+
+def test_matches_run_all_with_obstacles(random_simulation):
+    """Handed-over cars should keep seeing the obstacles of the field."""
+    reference = random_simulation(5, width=9, height=9, car_count=20, obstacle_rate=0.3)
+    candidate = random_simulation(5, width=9, height=9, car_count=20, obstacle_rate=0.3)
+
+    assert TiledSimulation(candidate, columns=3, rows=2).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+    assert all(car.field is candidate.field for car in candidate.cars.values())
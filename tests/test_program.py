@@ -0,0 +1,153 @@
+import mmap
+import pickle
+
+import pytest
+
+from app.car import Car
+from app.program import (
+    INTERN_MAX_LENGTH, MAX_NESTING, CommandStream, compile_commands, count_command, expand, find_turns, iter_runs,
+    parse_program, validate_commands
+)
+
+
+@pytest.mark.parametrize("source,expanded", [
+    ("F1000", "F" * 1000),
+    ("(FFR)*250", "FFR" * 250),
+    ("L*3FR2", "LLLFRR"),
+    ("((FL)2R)3", "FLFLR" * 3),
+    ("F0(L)*0R", "R"),
+    ("FF(F)4", "F" * 6),
+])
+def test_parse_and_expand(source, expanded):
+    """Counts and groups should expand to the plain program."""
+    program = parse_program(source)
+    assert program.expand() == expanded.encode()
+    assert len(program) == len(expanded)
+    assert [chr(program[i]) for i in range(len(program))] == list(expanded)
+
+
+def test_program_is_compact():
+    """Huge repeat counts should not be expanded in memory."""
+    program = parse_program("(FFR)*1000000000F5")
+    assert len(program) == 3 * 10 ** 9 + 5
+    assert chr(program[3 * 10 ** 9 - 1]) == "R"
+    assert chr(program[3 * 10 ** 9]) == "F"
+
+
+def test_runs_cover_a_window():
+    """runs() should yield (code, count) runs clipped to the requested steps."""
+    program = parse_program("(FFR)*3")
+    assert list(program.runs(1, 7)) == [(ord("F"), 1), (ord("R"), 1), (ord("F"), 2), (ord("R"), 1), (ord("F"), 1)]
+    assert list(iter_runs(b"FFLRR", 1)) == [(ord("F"), 1), (ord("L"), 1), (ord("R"), 2)]
+
+
+@pytest.mark.parametrize("source,message", [
+    ("XYZ", "Commands must only contain F, L, R."),
+    ("(FF", "Unbalanced"),
+    ("FF)", "Unexpected ')'"),
+    ("F*", "Missing repeat count"),
+    ("3F", "Unexpected '3'"),
+    ("(" * 1000 + "F" + ")" * 1000, "nested too deeply"),
+    ("F99999999999999999999", "repeat too many times"),
+    ("(" * 70 + "F" + ")2" * 70, "repeat too many times"),
+])
+def test_invalid_programs(source, message):
+    with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        validate_commands(source)
+
+
+def test_nesting_up_to_the_limit():
+    program = compile_commands("(" * MAX_NESTING + "FR" + ")" * MAX_NESTING)
+    assert len(program) == 2
+
+
+def test_plain_commands_stay_plain():
+    """Plain strings should keep their byte representation."""
+    assert compile_commands("FLR") == b"FLR"
+
+
+def test_car_runs_compressed_program(field):
+    """A car should step through a compressed program one command per step."""
+    car = Car("A", 0, 0, "N", field)
+    car.set_commands("(FR)*2F20")
+    assert car.commands == "(FR)*2F20"
+    while car.has_remaining_commands():
+        car.execute_next()
+    assert car.command_index == 24
+    assert car.posture() == (1, 0, "S")
+
+    clone = pickle.loads(pickle.dumps(car))
+    assert clone.commands == "(FR)*2F20"
+
+
+def test_commands_are_interned_and_counted():
+    """Identical sources should compile to one shared program, counted without expanding it."""
+    assert compile_commands("(FFR)*1000000000") is compile_commands("(FFR)*1000000000")
+    program = compile_commands("(FFR)*1000000000")
+    assert count_command(program, ord("F")) == 2 * 10 ** 9
+    assert count_command(program, ord("R"), 3 * 10 ** 9 - 2) == 1
+    assert count_command(b"FFLF", ord("F"), 1) == 2
+    assert count_command(memoryview(b"FFLF"), ord("L")) == 1
+
+
+def test_long_programs_are_not_interned():
+    """The intern cache should not keep large programs alive."""
+    commands = "F" * (INTERN_MAX_LENGTH + 1)
+    assert compile_commands(commands) == compile_commands(commands)
+    assert compile_commands(commands) is not compile_commands(commands)
+    looped = "(FR)*3" + "L" * INTERN_MAX_LENGTH
+    assert compile_commands(looped) is not compile_commands(looped)
+    assert compile_commands(looped).expand() == b"FRFRFR" + b"L" * INTERN_MAX_LENGTH
+
+def test_find_skips_loops_and_runs_of_turns():
+    program = compile_commands("F3(LR)*1000000000F(RL)*2")
+    assert program.find(ord("F"), 3) == 2 * 10 ** 9 + 3
+    assert program.find(ord("R"), 2 * 10 ** 9 + 3) == 2 * 10 ** 9 + 4
+    assert program.find(ord("F"), 2 * 10 ** 9 + 4) == -1
+    assert find_turns(program, 8) == 3
+    assert find_turns(b"FLLFRRRLF", 3) == 4
+    assert find_turns(memoryview(b"FLLFRRRLF"), 3, 5) == 5
+    assert find_turns(b"FLLFRRF", 3) == -1
+    # Long programs are searched a window at a time, resuming where the last search stopped
+    long = b"F" * 10000 + b"LLL"
+    resume = find_turns(long, 3)
+    assert 0 < resume < 10000
+    for _ in range(5):
+        resume = find_turns(long, 3, resume)
+    assert resume == 10000
+
+
+def test_stream_reads_ahead_in_chunks_and_drops_what_was_run():
+    stream = CommandStream.from_iterable(iter("FL R\nF" * 1000), chunk_size=16)
+    assert len(stream) == 16
+    assert stream[0] == ord("F") and stream[14] == ord("R") and len(stream) == 16
+    assert stream[15] == ord("F") and len(stream) == 32
+    assert stream[2000:2004] == b"FLRF"
+    assert stream[2995] == ord("F")
+    assert len(stream._buffer) <= 64
+    with pytest.raises(IndexError, match="dropped"):
+        stream[1000]
+    assert stream[3999] == ord("F") and stream.exhausted and len(stream) == 4000
+    with pytest.raises(IndexError):
+        stream[4000]
+
+
+def test_stream_sources_are_checked_as_read(tmp_path):
+    path = tmp_path / "commands.txt"
+    path.write_bytes(b"FFLR\n" * 100 + b"FX")
+    stream = CommandStream.from_file(str(path), chunk_size=64)
+    assert stream.source == str(path) and stream[100] == ord("F")
+    assert stream[399] == ord("R") and stream[400] == ord("F") and len(stream) == 402
+    assert stream[399:420] == b"RF"
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Unexpected 'X' at position 401"):
+            stream[401]
+
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as mapped:
+        stream = CommandStream.from_buffer(memoryview(mapped)[5:25], chunk_size=8)
+        assert bytes(stream[i] for i in range(16)) == b"FFLR" * 4
+        del stream
+    with pytest.raises(ValueError, match="step loop"):
+        expand(CommandStream.from_iterable(["FLR"]))
+    with pytest.raises(TypeError, match="cannot be pickled"):
+        pickle.dumps(CommandStream.from_iterable(["FLR"]))
@@ -0,0 +1,82 @@
+import pytest
+
+from app.field import Field
+from app.recorder import TrajectoryRecorder
+from app.simulation import Simulation
+
+
+def reference_poses(sim):
+    """Poses after every step, captured live through a step callback."""
+    sim.fast_forward = False
+    cars = list(sim.cars.values())
+    frames = [{car.name: car.posture() for car in cars}]
+    sim.instrument().on_step(lambda step, _: frames.append({car.name: car.posture() for car in cars}))
+    sim.run_all()
+    return frames
+
+
+@pytest.mark.parametrize("keyframe_every,memory_limit", [(64, 64 << 20), (3, 64 << 20), (1, 1), (5, 2000)])
+def test_recorded_poses_match_the_run(random_simulation, tmp_path, keyframe_every, memory_limit):
+    for seed in range(10):
+        expected = reference_poses(random_simulation(seed))
+        sim = random_simulation(seed)
+        recorder = sim.record(keyframe_every, memory_limit, path=str(tmp_path / f"spill{seed}.bin"))
+        sim.run_all()
+
+        assert (recorder.first_step, recorder.last_step) == (0, len(expected) - 1)
+        for step in reversed(range(len(expected))):
+            assert recorder.poses(step) == expected[step]
+        for step in range(len(expected)):
+            for name, pose in expected[step].items():
+                assert recorder.pose(name, step) == pose
+        recorder.close()
+
+
+def test_memory_cap_spills_to_disk(tmp_path):
+    sim = Simulation(Field(200, 200))
+    for i in range(100):
+        sim.add_car(f"C{i}", i, i, "N", "FRFL" * 100)
+    path = tmp_path / "spill.bin"
+    recorder = sim.record(keyframe_every=16, memory_limit=8000, path=str(path))
+    sim.run_all()
+
+    assert recorder.nbytes() <= 8000
+    assert path.stat().st_size > 8000
+    assert recorder.pose("C7", 400) == (7 + 100, 7 + 100, "N")
+    assert recorder.pose("C7", 3) == (8, 8, "E")
+    recorder.close()
+
+
+def test_only_changed_cars_are_stored():
+    """A parked fleet should cost nothing per step beyond the step offsets."""
+    sim = Simulation(Field(100, 100))
+    for i in range(50):
+        sim.add_car(f"P{i}", i, 0, "N", "")
+    sim.add_car("M", 0, 99, "E", "F" * 60)
+    recorder = sim.record(keyframe_every=1000)
+    sim.run_all()
+    assert recorder.pose("M", 60) == (60, 99, "E")
+    assert recorder.nbytes() < 51 * 17 + 61 * 8 + 60 * 5 + 1
+
+
+def test_recording_errors(simulation):
+    simulation.add_car("A", 0, 0, "N", "F")
+    recorder = simulation.record()
+    simulation.run_all()
+    with pytest.raises(ValueError, match="not recorded"):
+        recorder.pose("B", 0)
+    with pytest.raises(ValueError, match="Step 2 was not recorded"):
+        recorder.poses(2)
+    with pytest.raises(ValueError):
+        TrajectoryRecorder(keyframe_every=0)
+
+
+def test_resumed_run_records_from_its_step(simulation):
+    """A run resumed mid-way records from the step it resumed at."""
+    simulation.add_car("A", 0, 0, "N", "FFFF")
+    events = simulation.iter_events()
+    simulation.step_count = 2
+    recorder = simulation.record()
+    list(events)
+    assert (recorder.first_step, recorder.last_step) == (2, 6)
+    assert recorder.pose("A", 6) == (0, 4, "N")
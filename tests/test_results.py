@@ -0,0 +1,57 @@
+import csv
+import io
+
+import pytest
+
+from app.results import RunResult
+from app.sinks import CsvSink, JsonlSink, stream_events
+
+
+def _collision_simulation(simulation):
+    simulation.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    simulation.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+    simulation.add_car("C", 0, 0, "N", "F")
+    return simulation
+
+
+def test_columnar_result_reads_as_run_all_entries(simulation, random_simulation):
+    """The lazy entries should be exactly those of run_all, in the same order."""
+    result = _collision_simulation(simulation).run_all(columnar=True)
+    assert len(result) == 3
+    assert list(result.status) == [1, 1, 0]
+    assert list(result.collision_step) == [7, 7, -1]
+    assert [result.names[i] for i in result.partners_of(1)] == ["A"]
+    assert result[-1] == {"name": "C", "final": {"x": 0, "y": 1, "direction": "N"},
+                          "status": "completed", "collision": None}
+    assert [entry["name"] for entry in result[:2]] == ["A", "B"]
+    with pytest.raises(IndexError):
+        result[3]
+
+    for seed in range(5):
+        assert random_simulation(seed).run_all(columnar=True).to_list() == random_simulation(seed).run_all()
+
+
+def test_exports_match_the_sinks(random_simulation):
+    """The fast exports should write byte for byte what the sinks write from the entries."""
+    expected = random_simulation(4).run_all()
+    result = RunResult.from_entries(expected, names=[entry["name"] for entry in expected][::-1])
+
+    for sink, export in ((JsonlSink, result.write_jsonl), (CsvSink, result.write_csv)):
+        sinked, exported = io.StringIO(), io.StringIO()
+        stream_events(expected, sink(sinked, flush=False))
+        assert export(exported) == len(expected)
+        assert exported.getvalue() == sinked.getvalue()
+    assert next(csv.DictReader(io.StringIO(exported.getvalue())))["name"] == expected[0]["name"]
+
+
+def test_binary_round_trip(tmp_path, simulation):
+    result = _collision_simulation(simulation).run_all(columnar=True)
+    path = str(tmp_path / "result.bin")
+    result.save(path)
+    loaded = RunResult.load(path)
+    assert loaded.to_list() == result.to_list()
+    assert loaded.names == ["A", "B", "C"]
+
+    (tmp_path / "other.bin").write_bytes(b"not a result")
+    with pytest.raises(ValueError, match="not a simulation result"):
+        RunResult.load(str(tmp_path / "other.bin"))
@@ -0,0 +1,55 @@
+import pytest
+
+from app.scenario import parse_car_line, parse_scenario, scenario_from_dict
+
+
+def test_parse_scenario_reads_field_and_cars():
+    """The first line is the field, each following line a car; comments and blanks are skipped."""
+    field, rows, errors = parse_scenario([
+        "# two cars",
+        "10 10",
+        "",
+        "A 1 2 n ffrfffFRRL",
+        "B 7 8 W FFLFFFFFFF",
+        "C 0 0 E",
+    ])
+    assert (field.width, field.height) == (10, 10)
+    assert rows == [("A", 1, 2, "N", "FFRFFFFRRL"), ("B", 7, 8, "W", "FFLFFFFFFF"), ("C", 0, 0, "E", "")]
+    assert errors == []
+
+
+def test_parse_scenario_reports_bad_car_lines():
+    """Invalid car lines should be reported with their line number."""
+    _, rows, errors = parse_scenario(["5 5", "A 1 1 Z F", "B one 1 N F", "C 1 1 N XYZ", "D 1", "E 2 2 S LR"])
+    assert rows == [("E", 2, 2, "S", "LR")]
+    assert [number for number, _ in errors] == [2, 3, 4, 5]
+    assert errors[0][1] == "Invalid direction."
+    assert errors[2][1] == "Commands must only contain F, L, R."
+
+
+@pytest.mark.parametrize("lines", [[], ["# nothing"], ["ten ten"]])
+def test_parse_scenario_needs_a_field(lines):
+    """A missing or malformed field line should raise."""
+    with pytest.raises(ValueError):
+        parse_scenario(lines)
+
+
+def test_parse_car_line_uppercases():
+    assert parse_car_line("A 1 2 s lrf") == ("A", 1, 2, "S", "LRF")
+
+
+def test_scenario_from_dict():
+    field, rows = scenario_from_dict({"field": [4, 3], "cars": [{"name": "A", "x": 1, "y": 1, "direction": "N"}]})
+    assert (field.width, field.height) == (4, 3)
+    assert rows == [("A", 1, 1, "N", "")]
+
+
+def test_parse_car_line_accepts_compressed_commands():
+    assert parse_car_line("A 1 2 N (ffr)*3f2") == ("A", 1, 2, "N", "(FFR)*3F2")
+    with pytest.raises(ValueError, match="Unbalanced"):
+        parse_car_line("A 1 2 N (F")
+
+
+def test_scenario_from_dict_reads_obstacles():
+    field, _ = scenario_from_dict({"field": [4, 3], "cars": [], "obstacles": [[1, 1], [3, 2]]})
+    assert field.is_blocked(1, 1) and field.is_blocked(3, 2) and field.obstacle_count() == 2
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+from app.service import ServiceClient, SimulationService
+from app.simulation import Simulation
+from app.scenario import scenario_from_dict
+
+
+def _scenario(scenario_id, *cars, **extra):
+    return dict({"id": scenario_id, "field": [10, 10], "cars": [
+        {"name": name, "x": x, "y": y, "direction": d, "commands": c} for name, x, y, d, c in cars
+    ]}, **extra)
+
+
+COLLISION = _scenario("collision", ("A", 1, 2, "N", "FFRFFFFRRL"), ("B", 7, 8, "W", "FFLFFFFFFF"))
+# Pinned against the top edge for a billion steps: never ends on its own
+ENDLESS = _scenario("endless", ("A", 0, 0, "N", "(FR)*1000000000"))
+
+
+def _expected(scenario):
+    field, rows = scenario_from_dict(scenario)
+    sim = Simulation(field)
+    sim.add_cars(rows)
+    return sim.run_all()
+
+
+def _serve(test, **options):
+    """Run test(service, server) against a fresh service on a local TCP port."""
+    async def main():
+        service = SimulationService(**options)
+        server = await service.start()
+        try:
+            await asyncio.wait_for(test(service, server), timeout=30)
+        finally:
+            await service.close()
+    asyncio.run(main())
+
+
+def _port(server):
+    return server.sockets[0].getsockname()[1]
+
+
+def test_events_are_streamed_per_scenario():
+    async def test(service, server):
+        client = await ServiceClient.connect(port=_port(server))
+        messages = await client.run(COLLISION)
+        await client.close()
+
+        assert [m["event"] for m in messages[:-1]] == _expected(COLLISION)
+        assert messages[-1] == {"id": "collision", "done": True, "errors": []}
+    _serve(test, workers=1)
+
+
+def test_many_clients_are_served_concurrently():
+    async def test(service, server):
+        clients = [await ServiceClient.connect(port=_port(server)) for _ in range(4)]
+        scenarios = [_scenario(f"s{i}", ("A", i, 0, "N", "F" * (i + 1)), ("B", 9, 9, "S", "F")) for i in range(4)]
+        results = await asyncio.gather(*(
+            client.run(scenario) for client in clients for scenario in scenarios
+        ))
+        for client in clients:
+            await client.close()
+
+        for messages, scenario in zip(results, scenarios * 4):
+            assert [m["event"] for m in messages if "event" in m] == _expected(scenario)
+            assert all(m["id"] == scenario["id"] for m in messages)
+    _serve(test, workers=2, queue_size=3)
+
+
+def test_cancel_stops_a_running_scenario():
+    async def test(service, server):
+        client = await ServiceClient.connect(port=_port(server))
+        endless = asyncio.create_task(client.run(ENDLESS))
+        await asyncio.sleep(0.5)
+        await client.cancel("endless")
+        assert await endless == [{"id": "endless", "error": "Cancelled."}]
+
+        # The worker was replaced and serves the next scenario
+        messages = await client.run(COLLISION)
+        assert messages[-1]["done"]
+        await client.close()
+    _serve(test, workers=1)
+
+
+def test_cancel_sent_with_the_scenario_frees_its_slot():
+    """A scenario cancelled before it starts should still be answered and give its slot back."""
+    async def test(service, server):
+        for _ in range(3):
+            reader, writer = await asyncio.open_connection(port=_port(server))
+            writer.write(json.dumps(ENDLESS).encode() + b"\n" + json.dumps({"cancel": "endless"}).encode() + b"\n")
+            await writer.drain()
+            assert json.loads(await reader.readline()) == {"id": "endless", "error": "Cancelled."}
+            writer.close()
+
+        client = await ServiceClient.connect(port=_port(server))
+        messages = await client.run(COLLISION)
+        assert messages[-1]["done"]
+        await client.close()
+    _serve(test, workers=1, queue_size=2)
+
+
+def test_timeouts():
+    async def test(service, server):
+        client = await ServiceClient.connect(port=_port(server))
+        messages = await client.run(dict(ENDLESS, timeout=0.3))
+        assert messages == [{"id": "endless", "error": "Timed out after 0.3 s."}]
+        for timeout in ("5", 0, -1, True, [1]):
+            messages = await client.run(dict(COLLISION, timeout=timeout))
+            assert messages == [
+                {"id": "collision", "error": "Invalid request: timeout must be a positive number of seconds."}
+            ]
+        messages = await client.run(COLLISION)
+        assert messages[-1]["done"]
+        await client.close()
+    _serve(test, workers=1, timeout=10)
+
+
+def test_invalid_requests_and_unix_socket(tmp_path):
+    async def test(service, server):
+        path = str(tmp_path / "sim.sock")
+        await service.start(path=path)
+        client = await ServiceClient.connect(path=path)
+        messages = await client.run({"id": "bad", "cars": []})
+        assert messages[0]["error"].startswith("Invalid scenario")
+        rejected = await client.run(_scenario("rows", ("A", 1, 1, "N", "F"), ("B", 1, 1, "N", "F")))
+        assert rejected[-1]["errors"] == [{"row": 1, "error": "Position (1, 1) is already occupied by another car."}]
+        await client.close()
+    _serve(test, workers=1)
@@ -1,5 +1,9 @@
 import pytest
+from unittest.mock import patch
 from app.car import Car
+from app.field import Field
+from app.program import CommandStream
+from app.simulation import Simulation
 
 
 def test_add_and_list_single_car(simulation):
@@ -24,6 +28,12 @@ def test_add_car_outside_field(simulation):
         simulation.add_car("X", 11, 5, "N", "FF")
 
 
+def test_add_car_with_invalid_direction(simulation):
+    with pytest.raises(ValueError, match="Invalid direction 'Q'"):
+        simulation.add_car("X", 1, 1, "Q", "FF")
+    assert not simulation.cars and not simulation.is_occupied(1, 1)
+
+
 def test_run_all_no_collision(simulation, car):
     """Multiple cars should complete commands without colliding."""
     simulation.add_car("A", 1, 2, "N", "FF")
@@ -111,4 +121,296 @@ def test_uneven_commands(simulation):
     assert pos_B == (1, 2, "N")
 
     # Assert A didn't stop due to B's shorter command length
-    assert pos_A[1] > pos_B[1] or pos_A[0] != pos_B[0]
\ No newline at end of file
+    assert pos_A[1] > pos_B[1] or pos_A[0] != pos_B[0]
+
+def test_remove_car_frees_position(simulation):
+    """Removing a car should free its name and its cell."""
+    simulation.add_car("A", 1, 1, "N", "F")
+    simulation.remove_car("A")
+    assert not simulation.is_occupied(1, 1)
+    simulation.add_car("A", 1, 1, "E", "F")
+    assert simulation.cars["A"].posture() == (1, 1, "E")
+
+    with pytest.raises(ValueError, match="does not exist"):
+        simulation.remove_car("Z")
+
+
+def test_occupancy_follows_run(simulation):
+    """After a run the occupancy index should reflect the final positions."""
+    simulation.add_car("A", 1, 1, "N", "FF")
+    simulation.run_all()
+    assert simulation.is_occupied(1, 3)
+    assert not simulation.is_occupied(1, 1)
+
+
+def test_add_cars_reports_per_row_errors(simulation):
+    """Bulk loading should add the valid rows and report each invalid one."""
+    errors = simulation.add_cars([
+        ("A", 1, 1, "N", "F"),
+        ("B", 1, 1, "E", "F"),     # occupied by row 0
+        ("A", 2, 2, "N", "F"),     # duplicate name of row 0
+        ("C", 20, 2, "N", "F"),    # out of bounds
+        ("D", 3, 3, "Q", "F"),     # invalid direction
+        ("E", 3, 3),               # malformed row
+        ("F", 4, 4, "S", "LR"),
+    ])
+
+    assert [row for row, _ in errors] == [1, 2, 3, 4, 5]
+    assert "already occupied" in errors[0][1]
+    assert "already exists" in errors[1][1]
+    assert "outside the field bounds" in errors[2][1]
+    assert list(simulation.cars) == ["A", "F"]
+
+
+def test_parked_and_frozen_cars_remain_collision_targets(simulation):
+    """Cars that stopped moving still collide with a car entering their cell."""
+    simulation.add_car("A", 0, 1, "E", "F")
+    simulation.add_car("B", 2, 1, "W", "F")
+    simulation.add_car("C", 1, 4, "S", "FFF")
+    simulation.add_car("D", 5, 5, "N", "")
+    simulation.add_car("E", 5, 7, "S", "FF")
+    result = simulation.run_all()
+
+    by_name = {r["name"]: r for r in result}
+    assert by_name["C"]["collision"] == {"with": ["A", "B"], "at": {"x": 1, "y": 1}, "step": 3}
+    assert by_name["D"]["collision"] == {"with": ["E"], "at": {"x": 5, "y": 5}, "step": 2}
+    assert [r["name"] for r in result] == ["A", "B", "D", "E", "C"]
+
+
+def test_only_moving_cars_are_stepped(simulation):
+    """Finished and frozen cars should not be stepped again while others keep moving."""
+    simulation.add_car("A", 0, 0, "N", "F")
+    simulation.add_car("B", 9, 0, "N", "FL" * 25)
+    calls = []
+    original = Car.execute_next
+
+    def counting_execute_next(self):
+        calls.append(self.name)
+        original(self)
+
+    with patch.object(Car, "execute_next", counting_execute_next):
+        simulation.run_all()
+
+    assert calls.count("A") == 1
+    assert calls.count("B") == 50
+
+
+def test_iter_events_yields_collisions_before_run_ends(simulation):
+    """A collision should be yielded while other cars still have commands left."""
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("B", 2, 0, "W", "F")
+    simulation.add_car("C", 5, 5, "N", "L" * 100)
+    events = simulation.iter_events()
+
+    first = next(events)
+    assert first["name"] == "A" and first["status"] == "collided"
+    assert simulation.cars["C"].command_index == 1
+
+    rest = list(events)
+    assert [e["name"] for e in rest] == ["B", "C"]
+    assert simulation.cars["C"].command_index == 100
+
+
+def test_run_all_equals_iter_events(random_simulation):
+    """run_all should be the materialised event stream."""
+    assert random_simulation(3).run_all() == list(random_simulation(3).iter_events())
+
+
+def test_add_car_on_obstacle():
+    sim = Simulation(Field(5, 5, [(2, 2)]))
+    with pytest.raises(ValueError, match="blocked by an obstacle"):
+        sim.add_car("A", 2, 2, "N", "F")
+    assert sim.add_cars([("A", 2, 2, "N", "F")]) == [(0, "Position (2, 2) is blocked by an obstacle.")]
+
+
+def test_stuck_and_spinning_cars_are_fast_forwarded(simulation):
+    """Cars that cannot leave their cell should not be stepped, yet end where run_all left them."""
+    simulation.add_car("A", 0, 9, "N", "F" * 1000 + "R" * 3)
+    simulation.add_car("B", 5, 5, "E", "L" * 999 + "FF")
+    simulation.add_car("C", 9, 9, "S", "F1000000000L")
+    simulation.fast_forward = True
+    calls = []
+    original = Car.execute_next
+
+    def counting_execute_next(self):
+        calls.append(self.name)
+        original(self)
+
+    with patch.object(Car, "execute_next", counting_execute_next):
+        result = simulation.run_all()
+
+    # A and C are parked once they have pressed into the edge, B right away
+    assert calls.count("A") == 1 and calls.count("B") == 2 and calls.count("C") == 10
+    assert [r["final"] for r in result] == [
+        {"x": 0, "y": 9, "direction": "W"},
+        {"x": 5, "y": 3, "direction": "S"},
+        {"x": 9, "y": 0, "direction": "E"},
+    ]
+    assert [c.command_index for c in simulation.cars.values()] == [1003, 1001, 1000000001]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fast_forward_matches_stepping_every_car(seed, random_simulation):
+    """Parked cars should still be hit, with the heading they would have had, at the same step."""
+    options = dict(width=7, height=7, car_count=20, max_commands=60, obstacle_rate=0.15 * (seed % 2))
+    reference = random_simulation(seed, **options)
+    reference.fast_forward = False
+    expected = reference.run_all()
+
+    sim = random_simulation(seed, **options)
+    sim.fast_forward = True
+    assert sim.run_all() == expected
+    assert sim.list_cars() == reference.list_cars()
+    assert [c.command_index for c in sim.cars.values()] == [c.command_index for c in reference.cars.values()]
+
+
+def test_parked_target_is_hit_with_its_current_heading(simulation):
+    simulation.add_car("A", 0, 0, "N", "R" * 10)
+    simulation.add_car("B", 3, 0, "W", "LRFFF")
+    simulation.fast_forward = True
+    events = simulation.iter_events()
+    first = next(events)
+    assert first == {
+        "name": "A", "final": {"x": 0, "y": 0, "direction": "E"}, "status": "collided",
+        "collision": {"with": ["B"], "at": {"x": 0, "y": 0}, "step": 5}
+    }
+    assert simulation.cars["A"].command_index == 5
+
+
+def test_compressed_spins_are_fast_forwarded(simulation):
+    """A billion turns in a loop should be skipped in closed form, not stepped."""
+    simulation.add_car("A", 0, 0, "N", "(LR)*1000000000LF")
+    simulation.add_car("B", 5, 5, "N", "F")
+    simulation.fast_forward = True
+    result = simulation.run_all()
+    assert result[0]["final"] == {"x": 0, "y": 0, "direction": "W"}
+    assert simulation.cars["A"].command_index == 2 * 10 ** 9 + 2
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_stepping_gives_the_same_entries_as_run_all(seed, random_simulation):
+    """A run driven step by step, then finished by run_all, should match a run made in one go."""
+    options = dict(obstacle_rate=0.1 * (seed % 2))
+    expected = random_simulation(seed, **options).run_all()
+
+    sim = random_simulation(seed, **options)
+    stepped = []
+    while sim.can_move():
+        stepped += sim.step() if sim.step_count % 2 else sim.run_until(sim.step_count + 3)
+    assert sim.run_all() == expected
+    assert stepped == expected[:len(stepped)]
+    assert all(entry["status"] == "completed" for entry in expected[len(stepped):])
+
+
+def test_cars_join_and_leave_a_run_in_progress(simulation):
+    simulation.add_car("A", 0, 0, "E", "F" * 6)
+    assert simulation.run_until(2) == []
+    assert simulation.cars["A"].position() == (2, 0)
+    with pytest.raises(ValueError, match="already occupied"):
+        simulation.add_car("X", 2, 0, "N", "F")
+    assert not simulation.is_occupied(0, 0)
+
+    simulation.add_car("B", 5, 2, "S", "FF")   # waits on (5, 0) from step 4, A gets there at step 5
+    simulation.add_car("D", 3, 1, "N", "")
+    assert simulation.step() == []
+    simulation.remove_car("D")
+    assert not simulation.is_occupied(3, 1)
+    events = simulation.run_until(10)
+    assert [(e["name"], e["collision"]["step"]) for e in events] == [("A", 5), ("B", 5)]
+    assert simulation.step_count == 10 and not simulation.can_move()
+
+    simulation.add_car("E", 9, 9, "S", "FF")   # time goes on for cars joining late
+    assert simulation.run_until(12) == []
+    assert simulation.cars["E"].position() == (9, 7)
+    assert [e["name"] for e in simulation.run_all()] == ["A", "B", "E"]
+    with pytest.raises(ValueError, match="behind"):
+        simulation.run_until(-1)
+
+
+def test_columnar_result_and_checkpoint_after_cars_left(tmp_path, simulation):
+    """Cars leaving a run should neither shift the rows of the result nor break a checkpoint."""
+    from app.checkpoint import load_checkpoint, save_checkpoint
+
+    simulation.add_car("A", 0, 0, "N", "FFFF")
+    simulation.add_car("B", 0, 2, "S", "F")
+    simulation.add_car("C", 3, 0, "E", "FF")
+    simulation.add_car("D", 5, 5, "E", "FF")
+    assert [e["name"] for e in simulation.step()] == ["A", "B"]
+    with pytest.raises(ValueError, match="collided in the run in progress"):
+        simulation.remove_car("A")
+    simulation.remove_car("C")
+    simulation.add_car("E", 9, 9, "S", "F")
+
+    path = str(tmp_path / "run.ckpt")
+    save_checkpoint(simulation, path)
+    expected = load_checkpoint(path).run_all()
+    result = simulation.run_all(columnar=True)
+    assert result.to_list() == expected
+    assert [(e["name"], e["status"], e["final"]["y"]) for e in expected] == [
+        ("A", "collided", 1), ("B", "collided", 1), ("D", "completed", 5), ("E", "completed", 8)
+    ]
+
+
+def test_car_hit_in_the_run_in_progress_cannot_leave_it(tmp_path, simulation):
+    """A car frozen in an earlier run and hit again in this one is named by its collision until the run ends."""
+    from app.checkpoint import save_checkpoint
+
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("C", 2, 0, "W", "F")
+    simulation.run_all()
+    simulation.add_car("B", 1, 2, "S", "FF")
+    simulation.step()
+    events = simulation.step()
+    assert [(e["name"], e["collision"]["with"]) for e in events] == [("B", ["A", "C"])]
+    for name in ("A", "C"):
+        with pytest.raises(ValueError, match="was hit in the run in progress"):
+            simulation.remove_car(name)
+    save_checkpoint(simulation, str(tmp_path / "run.ckpt"))
+    assert simulation.run_all(columnar=True).to_list()[0]["collision"]["with"] == ["A", "C"]
+    simulation.remove_car("A")
+
+
+@pytest.mark.parametrize("fast_forward", [True, False])
+def test_streamed_commands_run_like_in_memory_ones(simulation, fast_forward):
+    """Cars reading their commands from a stream should end as if given the whole string."""
+    programs = {"A": "L" * 5001 + "F" * 9000 + "RF" * 30, "B": ("F" * 300 + "R" * 17) * 5, "C": "FRFRFRFL" * 200}
+    expected = None
+    for streamed in (False, True):
+        sim = Simulation(simulation.field)
+        sim.fast_forward = fast_forward
+        for i, (name, commands) in enumerate(programs.items()):
+            if streamed:
+                commands = CommandStream.from_iterable([commands[j:j + 100] for j in range(0, len(commands), 100)],
+                                                       chunk_size=64)
+            sim.add_car(name, i * 3, i * 3, "N", commands)
+        result = sim.run_all()
+        expected = expected or result
+    assert result == expected
+    assert sim.cars["A"].commands == "<stream>"
+
+
+@pytest.mark.parametrize("fast_forward", [True, False])
+def test_invalid_streamed_command_raises_before_the_step(simulation, fast_forward):
+    """The step needing an invalid streamed command should raise before any car moves, on every retry."""
+    simulation.fast_forward = fast_forward
+    simulation.add_car("A", 0, 0, "N", CommandStream.from_iterable(["F", "FX", "FF"], chunk_size=1))
+    simulation.add_car("B", 5, 0, "N", "FFFF")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Unexpected 'X' at position 2"):
+            simulation.run_all()
+        assert simulation.step_count == 2
+        assert [car.position() for car in simulation.cars.values()] == [(0, 2), (5, 2)]
+
+
+def test_removing_one_of_the_crashed_cars_keeps_the_cell_occupied(simulation):
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("B", 2, 0, "W", "F")
+    simulation.add_car("C", 1, 0, "N", "")
+    simulation.run_all()
+    for name in ("A", "C"):
+        simulation.remove_car(name)
+        assert simulation.is_occupied(1, 0)
+        with pytest.raises(ValueError, match="already occupied"):
+            simulation.add_car("D", 1, 0, "N", "F")
+    simulation.remove_car("B")
+    assert not simulation.is_occupied(1, 0)
@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+
+from app.sinks import CsvSink, JsonlSink, flatten_event, stream_events
+
+
+def _collision_simulation(simulation):
+    simulation.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    simulation.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+    simulation.add_car("C", 0, 0, "N", "F")
+    return simulation
+
+
+def test_jsonl_sink_streams_run_all_entries(simulation):
+    """Every event should become one JSON line, in run_all order."""
+    out = io.StringIO()
+    count = stream_events(_collision_simulation(simulation).iter_events(), JsonlSink(out))
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert count == 3
+    assert [(e["name"], e["status"]) for e in lines] == [("A", "collided"), ("B", "collided"), ("C", "completed")]
+    assert lines[0]["collision"]["with"] == ["B"]
+
+
+def test_csv_sink_flattens_entries(simulation):
+    """CSV rows should carry the collision columns, blank for completed cars."""
+    out = io.StringIO()
+    stream_events(_collision_simulation(simulation).iter_events(), CsvSink(out))
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+
+    assert rows[0] == {
+        "name": "A", "status": "collided", "x": "5", "y": "4", "direction": "E",
+        "collision_step": "7", "collision_x": "5", "collision_y": "4", "collision_with": "B",
+    }
+    assert rows[2]["collision_step"] == ""
+
+
+def test_flatten_event_joins_partners():
+    """Several collision partners should be joined with ';'."""
+    entry = {"name": "C", "status": "collided", "final": {"x": 1, "y": 1, "direction": "S"},
+             "collision": {"with": ["A", "B"], "at": {"x": 1, "y": 1}, "step": 3}}
+    assert flatten_event(entry)["collision_with"] == "A;B"
@@ -0,0 +1,265 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from app.field import Field
+from app.simulation import Simulation
+from app.trajectory import TrajectoryEngine, configure_trajectory_cache, trajectory_cache_info
+
+
+def test_matches_run_all_on_collision_scenario(simulation):
+    """The trajectory engine should reproduce the reference two-car collision."""
+    simulation.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    simulation.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+    result = TrajectoryEngine(simulation).run()
+
+    assert [r["status"] for r in result] == ["collided", "collided"]
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 5, "y": 4}, "step": 7}
+    assert simulation.cars["A"].command_index == 7
+
+
+def test_frozen_car_blocks_later_arrivals(simulation):
+    """A car arriving on a cell where two cars already froze should collide with both."""
+    simulation.add_car("A", 0, 1, "E", "F")
+    simulation.add_car("B", 2, 1, "W", "F")
+    simulation.add_car("C", 1, 4, "S", "FFF")
+    result = TrajectoryEngine(simulation).run()
+
+    c_result = next(r for r in result if r["name"] == "C")
+    assert c_result["collision"] == {"with": ["A", "B"], "at": {"x": 1, "y": 1}, "step": 3}
+
+
+def test_freeze_cancels_later_collision(simulation):
+    """A car frozen early must not take part in the collisions its trace would have had."""
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("B", 2, 0, "W", "FFFF")
+    simulation.add_car("C", 0, 3, "S", "FFF")
+    result = TrajectoryEngine(simulation).run()
+
+    statuses = {r["name"]: r["status"] for r in result}
+    assert statuses == {"A": "collided", "B": "collided", "C": "completed"}
+    assert simulation.cars["C"].posture() == (0, 0, "S")
+
+
+def test_long_sparse_run():
+    """Long programs with a single late collision resolve without per-step scanning."""
+    sim = Simulation(Field(1000, 3))
+    sim.add_car("A", 0, 0, "E", "F" * 999)
+    sim.add_car("B", 999, 2, "S", "FF")
+    result = TrajectoryEngine(sim).run()
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 999, "y": 0}, "step": 999}
+    assert result[1]["collision"]["with"] == ["A"]
+
+
+def test_straight_runs_are_traced_as_legs():
+    """A forward run is one leg whatever its length, and legs meet between bucket edges."""
+    def build():
+        sim = Simulation(Field(200, 200))
+        sim.add_car("A", 51, 100, "E", "F100000")
+        sim.add_car("B", 150, 199, "S", "F50F150")
+        sim.add_car("C", 0, 0, "N", "F10RF10RF5")
+        return sim
+
+    engine = TrajectoryEngine(build())
+    assert engine.starts[0] == [0] and engine.moves[0] == [(1, 0, 148)]
+    assert engine.moves[1] == [(0, -1, 199)]
+    assert len(engine.starts[2]) == 3
+    result = engine.run()
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 150, "y": 100}, "step": 99}
+    assert result == build().run_all()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_matches_run_all_on_random_fleets(seed, random_simulation):
+    """History and final car state should be identical to the reference engine."""
+    reference = random_simulation(seed, width=8, height=8, car_count=25)
+    candidate = random_simulation(seed, width=8, height=8, car_count=25)
+
+    assert TrajectoryEngine(candidate).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+    assert [c.frozen for c in candidate.cars.values()] == [c.frozen for c in reference.cars.values()]
+    assert [c.command_index for c in candidate.cars.values()] == \
+        [c.command_index for c in reference.cars.values()]
+
+
+def _fresh_run(engine):
+    """Reference run_all over the start states the engine currently holds."""
+    sim = Simulation(engine.simulation.field)
+    for car, (x, y, heading, _, _) in zip(engine.cars, engine.start_states):
+        sim.add_car(car.name, x, y, "NESW"[heading], car.commands)
+    return sim.run_all()
+
+
+def test_update_car_reruns_only_the_edited_car(simulation):
+    """Editing one car should retrace that car only and give the fresh-run result."""
+    simulation.add_car("A", 0, 0, "E", "FFFF")
+    simulation.add_car("B", 4, 0, "W", "FFFF")
+    simulation.add_car("C", 9, 9, "S", "FF")
+    engine = TrajectoryEngine(simulation)
+    first = engine.run()
+    assert first[0]["collision"]["step"] == 2
+
+    with patch.object(TrajectoryEngine, "_trace", wraps=engine._trace) as trace:
+        engine.update_car("B", commands="LLFF")
+        second = engine.run()
+    assert trace.call_count == 1
+    assert all(r["status"] == "completed" for r in second)
+    assert second == _fresh_run(engine)
+    assert simulation.cars["A"].posture() == (4, 0, "E")
+
+
+def test_update_car_knock_on_freezes(simulation):
+    """An edit creating an early collision should cancel a later one elsewhere."""
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("B", 5, 0, "N", "")
+    simulation.add_car("C", 5, 3, "S", "FFF")
+    engine = TrajectoryEngine(simulation)
+    assert [r["status"] for r in engine.run()] == ["collided", "collided", "completed"]
+
+    # B now drives off and gets hit by A, so C reaches (5, 0) without hitting anyone
+    engine.update_car("B", x=2, y=0, direction="W", commands="F")
+    result = engine.run()
+    assert {r["name"]: r["status"] for r in result} == {"A": "collided", "B": "collided", "C": "completed"}
+    assert result == _fresh_run(engine)
+
+    engine.update_car("B", x=5, y=0, direction="N", commands="")
+    assert engine.run() == _fresh_run(engine)
+
+
+def test_update_car_validates_pose(simulation):
+    simulation.add_car("A", 0, 0, "E", "F")
+    simulation.add_car("B", 5, 0, "N", "")
+    engine = TrajectoryEngine(simulation)
+    with pytest.raises(ValueError, match="already occupied"):
+        engine.update_car("A", x=5, y=0)
+    with pytest.raises(ValueError, match="outside the field bounds"):
+        engine.update_car("A", x=10)
+    with pytest.raises(ValueError, match="does not exist"):
+        engine.update_car("Z", commands="F")
+    with pytest.raises(ValueError, match="Invalid direction 'X'"):
+        engine.update_car("A", direction="X")
+    assert engine.start_states[0] == (0, 0, 1, 0, False)
+
+
+def test_update_car_rejects_obstacles():
+    sim = Simulation(Field(10, 10, [(3, 0)]))
+    sim.add_car("A", 0, 0, "E", "FFFF")
+    engine = TrajectoryEngine(sim)
+    with pytest.raises(ValueError, match="blocked by an obstacle"):
+        engine.update_car("A", x=3, y=0)
+    assert engine.start_states[0][:2] == (0, 0)
+    assert engine.run()[0]["final"] == {"x": 2, "y": 0, "direction": "E"}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_edits_match_fresh_runs(seed, random_simulation):
+    """A chain of edits should always match a from-scratch run."""
+    rng = random.Random(seed)
+    engine = TrajectoryEngine(random_simulation(seed, width=6, height=6, car_count=12))
+    engine.run()
+    for _ in range(5):
+        name = f"C{rng.randrange(12)}"
+        commands = "".join(rng.choice("FFLR") for _ in range(rng.randint(0, 25)))
+        engine.update_car(name, direction=rng.choice("NESW"), commands=commands)
+        assert engine.run() == _fresh_run(engine)
+
+
+def test_compressed_programs_match_run_all():
+    """Run-length and loop programs should give the reference result, wall-pinned runs included."""
+    def build():
+        sim = Simulation(Field(50, 50))
+        sim.add_car("A", 0, 0, "E", "F100000L(FFR)*250")
+        sim.add_car("B", 49, 10, "S", "F5(L)*3F40R2F")
+        sim.add_car("C", 20, 20, "N", "((FL)3R)*40")
+        sim.add_car("D", 49, 49, "W", "L3F60")
+        return sim
+
+    reference = build()
+    expected = reference.run_all()
+    candidate = build()
+    assert TrajectoryEngine(candidate).run() == expected
+    assert candidate.list_cars() == reference.list_cars()
+    assert [c.command_index for c in candidate.cars.values()] == \
+        [c.command_index for c in reference.cars.values()]
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_matches_run_all_with_obstacles(seed, random_simulation):
+    """Forward runs should stop at the first obstacle, as run_all does."""
+    reference = random_simulation(seed, width=10, height=10, car_count=15, obstacle_rate=0.3)
+    candidate = random_simulation(seed, width=10, height=10, car_count=15, obstacle_rate=0.3)
+
+    assert TrajectoryEngine(candidate).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+
+
+def test_closed_form_run_stops_at_obstacle():
+    sim = Simulation(Field(100, 1, [(60, 0)]))
+    sim.add_car("A", 0, 0, "E", "F100000")
+    result = TrajectoryEngine(sim).run()
+    assert result[0]["final"] == {"x": 59, "y": 0, "direction": "E"}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_snapshots_match_recorded_run(seed, random_simulation):
+    """snapshot_at and pose_at should give the poses a recorded run_all went through."""
+    options = dict(width=9, height=9, car_count=20, obstacle_rate=0.1 * (seed % 3))
+    recorded = random_simulation(seed, **options)
+    recorder = recorded.record()
+    recorded.run_all()
+
+    sim = random_simulation(seed, **options)
+    before = sim.list_cars()
+    for step in range(recorder.last_step + 3):
+        expected = recorder.poses(min(step, recorder.last_step))
+        assert sim.snapshot_at(step) == expected
+        assert sim.pose_at("C0", step) == expected["C0"]
+    assert sim.list_cars() == before
+
+
+def test_pose_queries_use_compressed_runs_and_cache(simulation):
+    simulation.add_car("A", 5, 5, "N", "(RF)*3L1000000001F5")
+    simulation.add_car("B", 0, 9, "S", "F9")
+    assert simulation.pose_at("A", 10 ** 6) == (5, 4, "E")
+    assert simulation.pose_at("A", 2 * 10 ** 9) == (5, 0, "S")
+
+    with patch.object(TrajectoryEngine, "_trace") as trace:
+        assert simulation.snapshot_at(6) == {"A": (5, 4, "W"), "B": (0, 3, "S")}
+    trace.assert_not_called()
+
+    simulation.remove_car("B")
+    assert simulation.pose_at("A", 0) == (5, 5, "N")
+    with pytest.raises(ValueError, match="does not exist"):
+        simulation.pose_at("B", 1)
+    with pytest.raises(ValueError, match="negative"):
+        simulation.pose_at("A", -1)
+
+
+def test_identical_programs_share_cached_traces():
+    """Cars running one program should share a trace wherever the walls do not reach them."""
+    def build(width):
+        sim = Simulation(Field(width, width))
+        for i in range(10):
+            sim.add_car(f"C{i}", 10 + 7 * i, 10 + 3 * i, "N", "(FFRFFRFFRFFR)*5")
+        sim.add_car("W", 0, 0, "S", "(FFRFFRFFRFFR)*5")
+        return sim
+
+    configure_trajectory_cache(0)
+    expected = build(100).run_all()
+    assert TrajectoryEngine(build(100)).run() == expected
+
+    configure_trajectory_cache()
+    try:
+        assert TrajectoryEngine(build(100)).run() == expected
+        # The wall-free trace is shared across field sizes as well
+        TrajectoryEngine(build(1000))
+        info = trajectory_cache_info()
+        assert info["misses"] == 3 and info["hits"] == 21
+
+        sim = Simulation(Field(100, 100, [(50, 50)]))
+        sim.add_car("A", 10, 10, "N", "(FFRFFRFFRFFR)*5")
+        TrajectoryEngine(sim)
+        assert trajectory_cache_info()["misses"] == 3
+    finally:
+        configure_trajectory_cache()
@@ -0,0 +1,80 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.vectorized import VectorizedEngine
+
+
+def test_matches_run_all_on_collision_scenario(simulation):
+    """The vectorized engine should reproduce the reference two-car collision."""
+    simulation.add_car("A", 1, 2, "N", "FFRFFFFRRL")
+    simulation.add_car("B", 7, 8, "W", "FFLFFFFFFF")
+    result = VectorizedEngine(simulation).run()
+
+    assert [r["status"] for r in result] == ["collided", "collided"]
+    assert result[0]["collision"] == {"with": ["B"], "at": {"x": 5, "y": 4}, "step": 7}
+    assert simulation.cars["A"].frozen and simulation.cars["B"].frozen
+
+
+def test_wall_is_respected(simulation):
+    """Moves out of the field should be ignored just like Car.execute does."""
+    simulation.add_car("A", 0, 0, "S", "FFLF")
+    result = VectorizedEngine(simulation).run()
+    assert result[0]["final"] == {"x": 1, "y": 0, "direction": "E"}
+    assert simulation.cars["A"].posture() == (1, 0, "E")
+
+
+def test_unknown_letters_decode_to_no_op(simulation):
+    """Programs are decoded once into opcodes, unknown letters doing nothing but using up a step."""
+    simulation.add_car("A", 0, 0, "N", "FXRFLLyF")
+    simulation.add_car("B", 5, 5, "N", "ZZZZZZZZZZ")
+    result = VectorizedEngine(simulation).run()
+    assert result[0]["final"] == {"x": 0, "y": 1, "direction": "W"}
+    assert simulation.cars["A"].command_index == 8 and simulation.cars["B"].command_index == 10
+
+
+def test_parked_car_is_a_collision_target(simulation):
+    """A car that finished its commands still collides with a car entering its cell."""
+    simulation.add_car("A", 0, 0, "N", "")
+    simulation.add_car("B", 0, 2, "S", "FF")
+    result = VectorizedEngine(simulation).run()
+    assert [(r["name"], r["status"]) for r in result] == [("A", "collided"), ("B", "collided")]
+    assert result[0]["collision"]["step"] == 2
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_run_all_on_random_fleets(seed, random_simulation):
+    """History and final car state should be identical to the reference engine."""
+    reference = random_simulation(seed, width=8, height=8, car_count=25)
+    candidate = random_simulation(seed, width=8, height=8, car_count=25)
+
+    assert VectorizedEngine(candidate).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+    assert [c.frozen for c in candidate.cars.values()] == [c.frozen for c in reference.cars.values()]
+
+
+def test_compressed_programs_match_run_all():
+    """Compressed programs should be expanded into the shared program buffer."""
+    from app.field import Field
+    from app.simulation import Simulation
+
+    def build():
+        sim = Simulation(Field(20, 20))
+        sim.add_car("A", 0, 0, "E", "F30L(FFR)*10")
+        sim.add_car("B", 19, 5, "S", "F5(L)*3F20")
+        return sim
+
+    reference = build()
+    candidate = build()
+    assert VectorizedEngine(candidate).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_run_all_with_obstacles(seed, random_simulation):
+    """Moves into obstacles should be rejected by the batch passability check."""
+    reference = random_simulation(seed, width=10, height=10, car_count=15, obstacle_rate=0.3)
+    candidate = random_simulation(seed, width=10, height=10, car_count=15, obstacle_rate=0.3)
+
+    assert VectorizedEngine(candidate).run() == reference.run_all()
+    assert candidate.list_cars() == reference.list_cars()